@@ -0,0 +1,127 @@
+"""Tamanho e vazão do log de combates: JSON antigo contra o formato binário.
+
+Gera combates sintéticos (4 a 20 turnos) e compara:
+- bytes por combate de json.dumps e de combat_codec.encode;
+- codificação e decodificação por segundo em cada formato;
+- gravação no banco: JSON com um commit por combate (como log_combat
+  fazia) contra o binário em lote pelo CombatLogBuffer.
+
+Também confere que decode e iter_turns devolvem os combates gravados.
+
+Uso: python bench/combat_codec.py [--fights 5000]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import combat_codec
+from database import Database
+
+ACTIONS = ['ataque', 'defesa', 'kagune', 'esquiva', 'especial']
+
+
+def synthetic_fights(count, seed=7):
+    rnd = random.Random(seed)
+    fights = []
+    for _ in range(count):
+        turns = [
+            {'turn': turn + 1, 'actor': 'attacker' if turn % 2 == 0 else 'defender',
+             'action': rnd.choice(ACTIONS), 'damage': rnd.randint(0, 35),
+             'critical': rnd.random() < 0.1,
+             'attacker_hp': rnd.randint(0, 100), 'defender_hp': rnd.randint(0, 100)}
+            for turn in range(rnd.randint(4, 20))
+        ]
+        fights.append({
+            'attacker': {'name': 'Kaneki', 'faction': 'ghoul', 'level': 12},
+            'defender': {'name': 'Amon', 'faction': 'ccg', 'level': 11},
+            'turns': turns,
+            'result': 'vitória',
+            'duration': round(rnd.random() * 60, 2),
+        })
+    return fights
+
+
+def per_second(function, items):
+    started = time.perf_counter()
+    for item in items:
+        function(item)
+    return len(items) / (time.perf_counter() - started)
+
+
+def measure_codecs(fights):
+    """Retorna {formato: (bytes por combate, codificações/s, decodificações/s)}"""
+    results = {}
+    for label, encode, decode in (("JSON", json.dumps, json.loads),
+                                  ("binário", combat_codec.encode, combat_codec.decode)):
+        encoded = [encode(fight) for fight in fights]
+        size = sum(len(value.encode() if isinstance(value, str) else value) for value in encoded)
+        results[label] = (size / len(fights), per_second(encode, fights), per_second(decode, encoded))
+
+        assert [decode(value) for value in encoded] == fights
+        if label == "binário":
+            assert all(list(combat_codec.iter_turns(value)) == fight['turns']
+                       for value, fight in zip(encoded, fights))
+    return results
+
+
+async def measure_writes(fights, directory):
+    """Retorna {formato: combates gravados/s}"""
+    results = {}
+    now = int(time.time())
+
+    db = Database(os.path.join(directory, "json.db"))
+    await db.initialize()
+    try:
+        # Como o log_combat antigo: um combate por transação
+        started = time.perf_counter()
+        for fight in fights:
+            await db.insert_combat_logs([(1, 2, 1, json.dumps(fight), 10, now)])
+        results["JSON"] = len(fights) / (time.perf_counter() - started)
+    finally:
+        await db.close()
+
+    db = Database(os.path.join(directory, "binary.db"))
+    await db.initialize()
+    try:
+        started = time.perf_counter()
+        for fight in fights:
+            await db.log_combat(1, 2, 1, fight, 10)
+        await db.combat_logs.flush()
+        results["binário"] = len(fights) / (time.perf_counter() - started)
+
+        assert (await db.get_combat_log(1))['combat_data'] == fights[0]
+    finally:
+        await db.close()
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fights', type=int, default=5000)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    fights = synthetic_fights(args.fights)
+    codecs = measure_codecs(fights)
+    with tempfile.TemporaryDirectory() as directory:
+        writes = await measure_writes(fights, directory)
+
+    for label in ("JSON", "binário"):
+        size, encodes, decodes = codecs[label]
+        print(f"{label:8} {size:6.0f} B/combate  {encodes:8.0f} codificações/s  "
+              f"{decodes:8.0f} decodificações/s  {writes[label]:7.0f} combates gravados/s")
+
+    # O formato binário deve ocupar menos que o JSON
+    assert codecs["binário"][0] < codecs["JSON"][0]
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
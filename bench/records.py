@@ -0,0 +1,86 @@
+"""Memória e alocações dos registros com slots contra os dicts antigos.
+
+Carrega N linhas de characters de duas formas: dict(zip(colunas, linha))
+a partir de cursor.description (como get_character fazia) e a row factory
+Character.from_row. Mede com tracemalloc os bytes retidos por linha e o
+pico de alocação, além do tempo por linha.
+
+Uso: python bench/records.py [--rows 10000]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import Character, CHARACTER_COLUMNS, CHARACTER_FIELDS
+
+
+def build_database(rows):
+    conn = sqlite3.connect(':memory:')
+    conn.execute(f"CREATE TABLE characters ({', '.join(CHARACTER_FIELDS)})")
+    placeholders = ", ".join("?" * len(CHARACTER_FIELDS))
+    conn.executemany(
+        f"INSERT INTO characters VALUES ({placeholders})",
+        ([user_id, f"Personagem {user_id}", 'ghoul', 10, 12345, 20, 20, 20, 150, 150,
+          80, 80, 'Rinkaku', 7, 3, 1700000000, None, 'ativo', f"IC {user_id}", '20',
+          'ele/dele', 'Cabelo branco', 'História longa', 10, 10, 10, 10, 10]
+         for user_id in range(rows))
+    )
+    return conn
+
+
+def load_dicts(conn):
+    cursor = conn.execute(f"SELECT {CHARACTER_COLUMNS} FROM characters")
+    columns = [desc[0] for desc in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def load_records(conn):
+    cursor = conn.cursor()
+    cursor.row_factory = Character.from_row
+    cursor.execute(f"SELECT {CHARACTER_COLUMNS} FROM characters")
+    return cursor.fetchall()
+
+
+def measure(loader, conn, rows):
+    """Retorna (bytes retidos por linha, pico em KiB, µs por linha)"""
+    loader(conn)  # aquece caches de statements
+
+    tracemalloc.start()
+    records = loader(conn)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+
+    started = time.perf_counter()
+    loader(conn)
+    elapsed = time.perf_counter() - started
+    return retained / rows, peak / 1024, elapsed / rows * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    args = parser.parse_args()
+
+    conn = build_database(args.rows)
+    record = load_records(conn)[0]
+    row = load_dicts(conn)[0]
+    print(f"objeto: dict {sys.getsizeof(row)} B, Character {sys.getsizeof(record)} B")
+
+    results = {}
+    for label, loader in (("dict", load_dicts), ("Character", load_records)):
+        results[label] = measure(loader, conn, args.rows)
+        per_row, peak, micros = results[label]
+        print(f"{label:10} {per_row:7.0f} B/linha  pico {peak:8.0f} KiB  {micros:5.2f} µs/linha")
+
+    # Os registros com slots devem ocupar menos que os dicts
+    assert results["Character"][0] < results["dict"][0]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Teste de estresse dos locks por usuário (listrados) do Database.
+
+Vários usuários fazem add_experience + get_player concorrentes enquanto um
+administrador adiciona canais XP. Compara lock_stripes=1 (todas as
+alterações de usuários serializadas, como no antigo lock global) com o
+padrão listrado e verifica que nenhuma atualização se perde: a
+experiência final de cada usuário deve ser igual ao número de chamadas.
+
+Nos dois casos os canais XP usam um lock próprio; a latência do
+administrador reflete só a fila da thread de escrita, que fica mais
+cheia quanto mais alterações correm em paralelo.
+
+Uso: python bench/stress_locks.py [--users 100] [--calls 30] [--stripes 64]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+
+async def run_stress(lock_stripes, users=100, calls=30, admin_ops=50):
+    """Executa o estresse e retorna estatísticas; falha se houver atualização perdida"""
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, "stress.db"), lock_stripes=lock_stripes)
+        await db.initialize()
+        try:
+            for user_id in range(1, users + 1):
+                await db.create_character(user_id, f"user{user_id}", 'ghoul', 'Rinkaku')
+
+            admin_latencies = []
+
+            async def player(user_id):
+                for _ in range(calls):
+                    await db.add_experience(user_id, 1)
+                    await db.get_player(user_id)
+
+            async def admin():
+                for channel_id in range(admin_ops):
+                    started = time.perf_counter()
+                    await db.add_xp_channel(10_000 + channel_id, 1)
+                    admin_latencies.append(time.perf_counter() - started)
+                    await asyncio.sleep(0)
+
+            started = time.perf_counter()
+            await asyncio.gather(admin(), *(player(user_id) for user_id in range(1, users + 1)))
+            elapsed = time.perf_counter() - started
+
+            lost = {}
+            for user_id in range(1, users + 1):
+                experience = (await db.get_character(user_id))['experience']
+                if experience != calls:
+                    lost[user_id] = calls - experience
+            assert not lost, f"Atualizações perdidas (usuário -> quantidade): {lost}"
+
+            return {
+                'add_experience_per_s': users * calls / elapsed,
+                'admin_max_ms': max(admin_latencies) * 1000,
+                'lost_updates': 0,
+            }
+        finally:
+            await db.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--calls', type=int, default=30)
+    parser.add_argument('--stripes', type=int, default=64)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    for label, stripes in (("1 listra", 1), ("listrado", args.stripes)):
+        stats = await run_stress(stripes, args.users, args.calls)
+        print(f"{label:12} {stats['add_experience_per_s']:8.0f} add_experience/s  "
+              f"admin max {stats['admin_max_ms']:6.1f} ms  "
+              f"atualizações perdidas: {stats['lost_updates']}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,235 @@
+import json
+import struct
+import zlib
+
+# Formato binário de combat_data:
+#   byte 0: versão do formato
+#   byte 1: flags (FLAG_ZLIB, FLAG_TURNS)
+#   resto:  corpo, comprimido com zlib se FLAG_ZLIB
+# Com FLAG_TURNS o corpo é: número de turnos, cada turno e depois o
+# restante do dicionário (sem 'turns'); os turnos vêm primeiro para que
+# iter_turns possa lê-los um a um sem decodificar o resto.
+VERSION = 1
+FLAG_ZLIB = 0x01
+FLAG_TURNS = 0x02
+
+# Tags dos valores (inteiros 0..127 usam um único byte: SMALL_INT | n)
+NONE, FALSE, TRUE, INT, FLOAT, STR, STR_REF, LIST, DICT, SHAPE_REF, BYTES = range(11)
+SMALL_INT = 0x80
+
+# Strings curtas (chaves, ações, nomes) entram numa tabela e se repetem
+# como referência ao índice
+MAX_INTERNED = 32
+
+# Só comprime corpos a partir deste tamanho, e só se ficar menor
+COMPRESS_MIN_SIZE = 512
+
+_double = struct.Struct('<d')
+
+
+def _write_varint(out, value):
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+class _Encoder:
+    def __init__(self):
+        self.out = bytearray()
+        self.strings = {}
+        self.shapes = {}
+
+    def encode(self, value):
+        out = self.out
+        if value is None:
+            out.append(NONE)
+        elif value is True:
+            out.append(TRUE)
+        elif value is False:
+            out.append(FALSE)
+        elif isinstance(value, int):
+            if 0 <= value < 0x80:
+                out.append(SMALL_INT | value)
+            else:
+                out.append(INT)
+                # zigzag: negativos pequenos também ficam com poucos bytes
+                _write_varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+        elif isinstance(value, float):
+            out.append(FLOAT)
+            out += _double.pack(value)
+        elif isinstance(value, str):
+            index = self.strings.get(value)
+            if index is not None:
+                out.append(STR_REF)
+                _write_varint(out, index)
+                return
+            raw = value.encode()
+            out.append(STR)
+            _write_varint(out, len(raw))
+            out += raw
+            if len(value) <= MAX_INTERNED:
+                self.strings[value] = len(self.strings)
+        elif isinstance(value, (list, tuple)):
+            out.append(LIST)
+            _write_varint(out, len(value))
+            for item in value:
+                self.encode(item)
+        elif isinstance(value, dict):
+            # Dicionários com as mesmas chaves (ex.: turnos) gravam as chaves uma vez só
+            keys = tuple(value)
+            index = self.shapes.get(keys)
+            if index is not None:
+                out.append(SHAPE_REF)
+                _write_varint(out, index)
+            else:
+                out.append(DICT)
+                _write_varint(out, len(keys))
+                for key in keys:
+                    self.encode(key)
+                self.shapes[keys] = len(self.shapes)
+            for item in value.values():
+                self.encode(item)
+        elif isinstance(value, (bytes, bytearray)):
+            out.append(BYTES)
+            _write_varint(out, len(value))
+            out += value
+        else:
+            raise TypeError(f"Tipo não suportado em combat_data: {type(value).__name__}")
+
+
+class _Decoder:
+    def __init__(self, data, pos=0):
+        self.data = data
+        self.pos = pos
+        self.strings = []
+        self.shapes = []
+
+    def decode(self):
+        data = self.data
+        tag = data[self.pos]
+        self.pos += 1
+
+        if tag & SMALL_INT:
+            return tag & 0x7f
+        if tag == NONE:
+            return None
+        if tag == TRUE:
+            return True
+        if tag == FALSE:
+            return False
+        if tag == INT:
+            value, self.pos = _read_varint(data, self.pos)
+            return value >> 1 if not value & 1 else -((value + 1) >> 1)
+        if tag == FLOAT:
+            value, = _double.unpack_from(data, self.pos)
+            self.pos += 8
+            return value
+        if tag == STR:
+            length, self.pos = _read_varint(data, self.pos)
+            end = self.pos + length
+            value = bytes(data[self.pos:end]).decode()
+            self.pos = end
+            if len(value) <= MAX_INTERNED:
+                self.strings.append(value)
+            return value
+        if tag == STR_REF:
+            index, self.pos = _read_varint(data, self.pos)
+            return self.strings[index]
+        if tag == LIST:
+            count, self.pos = _read_varint(data, self.pos)
+            return [self.decode() for _ in range(count)]
+        if tag == DICT:
+            count, self.pos = _read_varint(data, self.pos)
+            keys = [self.decode() for _ in range(count)]
+            self.shapes.append(keys)
+            return {key: self.decode() for key in keys}
+        if tag == SHAPE_REF:
+            index, self.pos = _read_varint(data, self.pos)
+            return {key: self.decode() for key in self.shapes[index]}
+        if tag == BYTES:
+            length, self.pos = _read_varint(data, self.pos)
+            end = self.pos + length
+            value = bytes(data[self.pos:end])
+            self.pos = end
+            return value
+        raise ValueError(f"Tag inválida em combat_data: {tag}")
+
+
+def encode(combat_data, compress=True):
+    """Codifica combat_data (valores compatíveis com JSON) no formato binário"""
+    encoder = _Encoder()
+    flags = 0
+
+    turns = combat_data.get('turns') if isinstance(combat_data, dict) else None
+    if isinstance(turns, list):
+        flags |= FLAG_TURNS
+        _write_varint(encoder.out, len(turns))
+        for turn in turns:
+            encoder.encode(turn)
+        encoder.encode({key: value for key, value in combat_data.items() if key != 'turns'})
+    else:
+        encoder.encode(combat_data)
+
+    body = bytes(encoder.out)
+    if compress and len(body) >= COMPRESS_MIN_SIZE:
+        compressed = zlib.compress(body)
+        if len(compressed) < len(body):
+            flags |= FLAG_ZLIB
+            body = compressed
+    return bytes((VERSION, flags)) + body
+
+
+def _open(blob):
+    if blob[0] != VERSION:
+        raise ValueError(f"Versão de combat_data desconhecida: {blob[0]}")
+    flags = blob[1]
+    body = memoryview(blob)[2:]
+    if flags & FLAG_ZLIB:
+        body = zlib.decompress(body)
+    return flags, _Decoder(body)
+
+
+def decode(value):
+    """Decodifica combat_data gravado no banco (binário ou JSON antigo)"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return json.loads(value)
+
+    flags, decoder = _open(value)
+    if not flags & FLAG_TURNS:
+        return decoder.decode()
+
+    count, decoder.pos = _read_varint(decoder.data, decoder.pos)
+    turns = [decoder.decode() for _ in range(count)]
+    combat_data = decoder.decode()
+    combat_data['turns'] = turns
+    return combat_data
+
+
+def iter_turns(value):
+    """Itera pelos turnos de um combate um a um, sem montar o combate inteiro"""
+    if value is None:
+        return
+    if isinstance(value, str):
+        yield from json.loads(value).get('turns', [])
+        return
+
+    flags, decoder = _open(value)
+    if not flags & FLAG_TURNS:
+        return
+    count, decoder.pos = _read_varint(decoder.data, decoder.pos)
+    for _ in range(count):
+        yield decoder.decode()
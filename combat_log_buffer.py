@@ -0,0 +1,54 @@
+import asyncio
+
+from write_behind import WriteBehindLoop
+
+
+class CombatLogBuffer:
+    """Buffer write-behind do log de combates.
+
+    log_combat só enfileira a linha já codificada; as linhas são gravadas
+    em lote (um único executemany por transação) a cada `flush_interval`
+    segundos ou quando `flush_threshold` combates estão pendentes.
+    """
+
+    def __init__(self, db, flush_interval=2.0, flush_threshold=100):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+
+        # (attacker_id, defender_id, winner_id, combat_data, experience_gained, timestamp)
+        self._pending = []
+        self._flush_lock = asyncio.Lock()
+        self._writer = WriteBehindLoop(self.flush, flush_interval, "Erro ao gravar log de combates")
+
+    def __len__(self):
+        return len(self._pending)
+
+    def start(self):
+        """Inicia o flush periódico"""
+        self._writer.start()
+
+    async def stop(self):
+        """Para o flush periódico e grava o que estiver pendente"""
+        await self._writer.stop()
+
+    def add(self, row):
+        """Enfileira um combate para a próxima gravação em lote"""
+        self._pending.append(row)
+        if len(self._pending) >= self.flush_threshold:
+            self._writer.trigger()
+
+    async def flush(self):
+        """Grava todos os combates pendentes em uma única transação"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            batch, self._pending = self._pending, []
+            try:
+                await self.db.insert_combat_logs(batch)
+            except Exception:
+                # Devolver as linhas para a próxima tentativa, na ordem original
+                self._pending[:0] = batch
+                raise
+            return len(batch)
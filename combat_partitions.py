@@ -0,0 +1,190 @@
+import os
+import re
+import shutil
+import sqlite3
+from collections import OrderedDict
+from datetime import datetime
+
+# Políticas de retenção para partições antigas
+DROP = 'drop'        # apaga o arquivo do mês
+ARCHIVE = 'archive'  # move o arquivo para a pasta archive/ (fora das consultas)
+
+# Esquema de cada partição mensal (mesmas colunas de combat_logs)
+PARTITION_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS {alias}.combat_logs (
+        id INTEGER PRIMARY KEY,
+        attacker_id INTEGER NOT NULL,
+        defender_id INTEGER NOT NULL,
+        winner_id INTEGER,
+        combat_data BLOB,
+        experience_gained INTEGER,
+        timestamp INTEGER NOT NULL
+    )
+"""
+
+# Versão do esquema das partições (PRAGMA user_version de cada arquivo);
+# arquivos na versão 0 ainda têm timestamp em texto ISO-8601
+PARTITION_VERSION = 1
+
+# Índices de cada partição: histórico por jogador (keyset por id), vencedor e período
+PARTITION_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS {alias}.idx_combat_logs_attacker ON combat_logs (attacker_id, id)",
+    "CREATE INDEX IF NOT EXISTS {alias}.idx_combat_logs_defender ON combat_logs (defender_id, id)",
+    "CREATE INDEX IF NOT EXISTS {alias}.idx_combat_logs_winner ON combat_logs (winner_id)",
+    "CREATE INDEX IF NOT EXISTS {alias}.idx_combat_logs_timestamp ON combat_logs (timestamp)",
+)
+
+# Teto absoluto de SQLITE_LIMIT_ATTACHED; cada build do SQLite pode ter um menor (10 por padrão)
+_MAX_ATTACHED = 125
+
+_FILE_PATTERN = re.compile(r'combat_logs_(\d{4})_(\d{2})\.db$')
+
+
+def attach_limit():
+    """Máximo de bancos anexados por conexão permitido por esta build do SQLite"""
+    conn = sqlite3.connect(':memory:')
+    try:
+        conn.setlimit(sqlite3.SQLITE_LIMIT_ATTACHED, _MAX_ATTACHED)
+        return conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    finally:
+        conn.close()
+
+
+def month_key(timestamp):
+    """Mês da partição ('AAAA_MM') a partir de um timestamp ISO ou epoch"""
+    if isinstance(timestamp, str):
+        return f"{timestamp[:4]}_{timestamp[5:7]}"
+    moment = datetime.fromtimestamp(timestamp)
+    return f"{moment.year:04d}_{moment.month:02d}"
+
+
+class CombatPartitions:
+    """Partições mensais do log de combates em arquivos SQLite anexados.
+
+    Cada mês fica em `directory/combat_logs_AAAA_MM.db`, fora do banco
+    principal. As conexões anexam (ATTACH) só as partições que a consulta
+    precisa, mantendo no máximo `max_attached` por conexão. O padrão cabe
+    todos os meses retidos mais o mês novo, para que as consultas que
+    percorrem todas as partições não fiquem anexando e desanexando a cada
+    chamada. A retenção remove meses inteiros: apagar ou mover um arquivo
+    custa O(1), sem DELETEs grandes.
+    """
+
+    def __init__(self, directory, retention_months=9, policy=ARCHIVE, max_attached=None):
+        if policy not in (DROP, ARCHIVE):
+            raise ValueError(f"Política de retenção inválida: {policy}")
+        if max_attached is None:
+            max_attached = retention_months + 1
+        limit = attach_limit()
+        if max_attached > limit:
+            raise ValueError(
+                f"max_attached={max_attached} excede o limite de {limit} bancos anexados "
+                f"deste SQLite; reduza a retenção para no máximo {limit - 1} meses"
+            )
+        self.directory = directory
+        self.retention_months = retention_months
+        self.policy = policy
+        self.max_attached = max_attached
+
+        # Meses com arquivo ativo; sempre substituído (nunca alterado no lugar)
+        # porque as threads de leitura o percorrem sem lock
+        self._months = frozenset()
+        self._attached = {}    # conexão -> OrderedDict(mês -> alias), em ordem de uso
+
+    def configure(self, conn):
+        """Ajusta o limite de ATTACH da conexão para caber `max_attached` partições"""
+        conn.setlimit(sqlite3.SQLITE_LIMIT_ATTACHED, self.max_attached)
+
+    def scan(self):
+        """Carrega os meses existentes no diretório"""
+        os.makedirs(self.directory, exist_ok=True)
+        self._months = frozenset(
+            f"{match[1]}_{match[2]}"
+            for match in map(_FILE_PATTERN.match, os.listdir(self.directory)) if match
+        )
+
+    def months(self, since=None):
+        """Meses ativos, do mais recente ao mais antigo (a partir do mês de `since`)"""
+        first = month_key(since) if since is not None else None
+        return [month for month in sorted(self._months, reverse=True)
+                if first is None or month >= first]
+
+    def path(self, month):
+        return os.path.join(self.directory, f"combat_logs_{month}.db")
+
+    def attach(self, conn, month, create=False):
+        """Anexa a partição à conexão (se preciso) e retorna o alias do schema.
+
+        Deve ser chamado fora de transação. Com create=True (só na thread de
+        escrita) o arquivo e a tabela são criados se ainda não existirem.
+        """
+        attached = self._attached.setdefault(conn, OrderedDict())
+        alias = attached.get(month)
+        if alias is not None:
+            attached.move_to_end(month)
+            return alias
+
+        if month not in self._months and not create:
+            return None
+
+        while len(attached) >= self.max_attached:
+            _, oldest = attached.popitem(last=False)
+            conn.execute(f"DETACH DATABASE {oldest}")
+
+        alias = f"combats_{month}"
+        conn.execute("ATTACH DATABASE ? AS " + alias, (self.path(month),))
+        attached[month] = alias
+        if create and month not in self._months:
+            conn.execute(f"PRAGMA {alias}.journal_mode = WAL")
+            conn.execute(PARTITION_SCHEMA.format(alias=alias))
+            conn.execute(f"PRAGMA {alias}.user_version = {PARTITION_VERSION}")
+            for index in PARTITION_INDEXES:
+                conn.execute(index.format(alias=alias))
+            conn.commit()
+            self._months = self._months | {month}
+        return alias
+
+    def ensure_indexes(self, conn):
+        """Cria os índices que faltarem nas partições existentes (thread de escrita)"""
+        for month in self.months():
+            alias = self.attach(conn, month)
+            for index in PARTITION_INDEXES:
+                conn.execute(index.format(alias=alias))
+            conn.commit()
+
+    def detach(self, conn, month):
+        attached = self._attached.get(conn)
+        alias = attached.pop(month, None) if attached else None
+        if alias is not None:
+            conn.execute(f"DETACH DATABASE {alias}")
+
+    def forget_connection(self, conn):
+        self._attached.pop(conn, None)
+
+    def expired(self, now=None):
+        """Meses fora da janela de retenção"""
+        now = now or datetime.now()
+        index = now.year * 12 + now.month - 1 - (self.retention_months - 1)
+        cutoff = f"{index // 12:04d}_{index % 12 + 1:02d}"
+        return sorted(month for month in self._months if month < cutoff)
+
+    def apply_retention(self, conn, now=None):
+        """Remove da consulta (e do disco, conforme a política) os meses expirados"""
+        removed = []
+        for month in self.expired(now):
+            # Incorpora o WAL ao arquivo antes de tirá-lo de uso
+            alias = self.attach(conn, month)
+            conn.execute(f"PRAGMA {alias}.wal_checkpoint(TRUNCATE)")
+            self.detach(conn, month)
+            self._months = self._months - {month}
+
+            path = self.path(month)
+            if self.policy == ARCHIVE:
+                archive = os.path.join(self.directory, 'archive')
+                os.makedirs(archive, exist_ok=True)
+                shutil.move(path, os.path.join(archive, os.path.basename(path)))
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+            removed.append(month)
+        return removed
@@ -2,26 +2,150 @@ import discord
 from discord.ext import commands
 import random
 import asyncio
+from contextlib import aclosing
+from datetime import datetime
+from record_cache import MISSING
 
-class ProfileView(discord.ui.View):
-    """View para o sistema de perfil interativo"""
+# Abas do perfil: custom_id -> (rótulo do botão, estilo)
+PROFILE_TABS = {
+    'attributes': ('📊 Atributos', discord.ButtonStyle.primary),
+    'info': ('👤 Informações', discord.ButtonStyle.secondary),
+    'abilities': ('✨ Habilidades', discord.ButtonStyle.secondary),
+    'equipment': ('🎒 Equipamento', discord.ButtonStyle.secondary),
+    'history': ('📜 Histórico', discord.ButtonStyle.secondary),
+}
+
+# Título de cada aba ({name} = nome de exibição do dono do perfil)
+PROFILE_TITLES = {
+    'attributes': "📊 Atributos de {name}",
+    'info': "👤 Informações de {name}",
+    'abilities': "✨ Habilidades de {name}",
+    'equipment': "🎒 Equipamento de {name}",
+    'history': "📜 Histórico de combates de {name}",
+}
+
+# Quantidade de combates recentes e de rivais exibidos na aba de histórico
+HISTORY_RECENT = 5
+HISTORY_RIVALS = 3
+
+# Facção -> (emoji, nome exibido); qualquer outra facção é exibida como CCG
+FACTION_DISPLAY = {
+    'ghoul': ("👹", "Ghoul"),
+    'ccg': ("🛡️", "Investigador CCG"),
+}
+
+# Descrições dos tipos de kagune
+KAGUNE_DESCRIPTIONS = {
+    'Rinkaku': '🐙 Tentáculos regenerativos com alta capacidade de cura',
+    'Ukaku': '🦅 Cristais aéreos com alta velocidade e projéteis',
+    'Koukaku': '🛡️ Armadura defensiva com alta resistência',
+    'Bikaku': '🦂 Cauda versátil com equilíbrio entre ataque e defesa'
+}
+
+# Descrições dos tipos de quinque
+QUINQUE_DESCRIPTIONS = {
+    'Espada': '⚔️ Lâmina cortante para combate corpo a corpo',
+    'Lança': '🔱 Arma de longo alcance com perfuração',
+    'Martelo': '🔨 Arma pesada com impacto devastador',
+    'Chicote': '🞭 Arma flexível para controle de área'
+}
+
+# Campo preenchido a cada exibição: a posição muda com os dados dos outros jogadores
+RANK_FIELD = "🏆 Ranking"
+
+async def resolve_user(interaction, user_id):
+    """Obtém o usuário pelo ID, usando o cache antes de consultar a API"""
+    user = None
+    if interaction.guild is not None:
+        user = interaction.guild.get_member(user_id)
+    if user is None:
+        user = interaction.client.get_user(user_id)
+    if user is None:
+        user = await interaction.client.fetch_user(user_id)
+    return user
+
+async def acknowledge(interaction, button):
+    """Confirma a interação antes de qualquer consulta e registra a latência do botão.
+    
+    A latência medida vai da criação da interação até a confirmação, ou
+    seja, quanto do prazo de 3 segundos do Discord foi consumido.
+    """
+    await interaction.response.defer()
+    elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+    interaction.client.button_latency[button].record(max(0.0, elapsed))
+
+class ProfileRenderer:
+    """Monta os embeds das abas do perfil de um usuário.
+    
+    O conteúdo de cada aba fica em bot.profile_embeds com a chave
+    (user_id, aba, versão dos dados); enquanto o jogador não for alterado,
+    trocar de aba não consulta o banco nem monta os campos de novo. Nome,
+    avatar e posição no ranking são aplicados a cada exibição.
+    """
     
     def __init__(self, target_user, bot):
-        super().__init__(timeout=300)  # 5 minutos de timeout
         self.target_user = target_user
         self.bot = bot
-        self.current_tab = "attributes"
+        self._snapshot = None
     
-    async def get_character_data(self):
-        """Obtém dados do personagem"""
-        character = await self.bot.db.get_character(self.target_user.id)
-        player = await self.bot.db.get_player(self.target_user.id)
+    async def create_tab_embed(self, tab):
+        """Cria o embed da aba pedida, reaproveitando o conteúdo em cache"""
+        if tab not in PROFILE_TITLES:
+            tab = 'attributes'
+        
+        user_id = self.target_user.id
+        cache = self.bot.profile_embeds
+        key = (user_id, tab, await self.bot.db.get_data_version(user_id))
+        
+        payload = cache.get(key)
+        if payload is MISSING:
+            token = cache.token(key)
+            if tab == 'info':
+                embed = await self.create_info_embed()
+            elif tab == 'abilities':
+                embed = await self.create_abilities_embed()
+            elif tab == 'equipment':
+                embed = await self.create_equipment_embed()
+            elif tab == 'history':
+                embed = await self.create_history_embed()
+            else:
+                embed = await self.create_attributes_embed()
+            payload = embed.to_dict()
+            cache.put(key, payload, token)
+        
+        # Lista de campos própria: o payload em cache não pode ser alterado
+        payload['fields'] = list(payload.get('fields', []))
+        embed = discord.Embed.from_dict(payload)
+        embed.title = PROFILE_TITLES[tab].format(name=self.target_user.display_name)
+        embed.set_thumbnail(url=self.target_user.display_avatar.url)
+        if tab == 'attributes':
+            await self.add_rank_field(embed)
+        return embed
+    
+    async def add_rank_field(self, embed):
+        """Preenche a posição do jogador nos rankings (sem I/O)"""
+        index = next((i for i, field in enumerate(embed.fields) if field.name == RANK_FIELD), None)
+        if index is None:
+            return
         
-        if not player:
-            await self.bot.db.create_player(self.target_user.id)
-            player = await self.bot.db.get_player(self.target_user.id)
-            
-        return character, player
+        xp_rank = await self.bot.db.get_player_rank(self.target_user.id)
+        if not xp_rank:
+            embed.remove_field(index)
+            return
+        
+        rank_lines = [f"📈 **XP:** #{xp_rank['rank']} de {xp_rank['total']} "
+                      f"(à frente de {xp_rank['percentile']:.1f}%)"]
+        wins_rank = await self.bot.db.get_character_rank(self.target_user.id)
+        if wins_rank:
+            rank_lines.append(f"⚔️ **Vitórias:** #{wins_rank['rank']} de {wins_rank['total']} "
+                              f"(à frente de {wins_rank['percentile']:.1f}%)")
+        embed.set_field_at(index, name=RANK_FIELD, value="\n".join(rank_lines), inline=False)
+    
+    async def get_character_data(self):
+        """Obtém dados do personagem (uma única consulta por renderizador)"""
+        if self._snapshot is None:
+            self._snapshot = await self.bot.db.get_profile_snapshot(self.target_user.id)
+        return self._snapshot
     
     def create_progress_bar(self, current, maximum, length=15):
         """Cria barra de progresso visual"""
@@ -41,25 +165,18 @@ class ProfileView(discord.ui.View):
         stat_points = player['stat_points']
         
         # Calcular XP para próximo nível
-        if level == 1:
-            xp_needed_next = 100
-            xp_current_level = 0
-        else:
-            xp_needed_next = self.bot.db._xp_for_next_level(level)
-            xp_current_level = self.bot.db._xp_needed_for_level(level)
+        level_curve = self.bot.db.level_curve
+        xp_needed_next = level_curve.xp_to_next_level(level)
+        xp_current_level = level_curve.xp_for_level(level)
         
         xp_progress = current_xp - xp_current_level
         progress_bar = self.create_progress_bar(xp_progress, xp_needed_next)
         progress_percent = (xp_progress / xp_needed_next) * 100 if xp_needed_next > 0 else 100
         
-        embed = discord.Embed(
-            title=f"📊 Atributos de {self.target_user.display_name}",
-            color=0xff6b35
-        )
+        embed = discord.Embed(color=0xff6b35)
         
         if character:
-            faction_emoji = "👹" if character['faction'] == 'ghoul' else "🛡️"
-            faction_name = "Ghoul" if character['faction'] == 'ghoul' else "Investigador CCG"
+            faction_emoji, faction_name = FACTION_DISPLAY.get(character['faction'], FACTION_DISPLAY['ccg'])
             embed.add_field(
                 name="🏴 Facção",
                 value=f"{faction_emoji} **{faction_name}**",
@@ -79,8 +196,15 @@ class ProfileView(discord.ui.View):
             inline=True
         )
         
+        # Posição nos rankings (preenchida por add_rank_field a cada exibição)
+        embed.add_field(
+            name=RANK_FIELD,
+            value="—",
+            inline=False
+        )
+        
         # Barra de progresso XP
-                embed.add_field(
+        embed.add_field(
             name="📈 Progresso XP",
             value=f"{progress_bar}\n" # <--- MUDANÇA AQUI
                   f"**{xp_progress:.0f}** / **{xp_needed_next}** XP ({progress_percent:.1f}%)",
@@ -122,7 +246,6 @@ class ProfileView(discord.ui.View):
                 inline=False
             )
         
-        embed.set_thumbnail(url=self.target_user.display_avatar.url)
         embed.set_footer(text="Use os botões abaixo para navegar pelas abas do perfil")
         
         return embed
@@ -131,10 +254,7 @@ class ProfileView(discord.ui.View):
         """Cria embed da aba de informações pessoais"""
         character, player = await self.get_character_data()
         
-        embed = discord.Embed(
-            title=f"👤 Informações de {self.target_user.display_name}",
-            color=0x3498db
-        )
+        embed = discord.Embed(color=0x3498db)
         
         if character:
             embed.add_field(
@@ -173,7 +293,6 @@ class ProfileView(discord.ui.View):
                 inline=False
             )
         
-        embed.set_thumbnail(url=self.target_user.display_avatar.url)
         embed.set_footer(text="Clique em 'Editar Informações' para atualizar seus dados")
 
         return embed
@@ -182,10 +301,7 @@ class ProfileView(discord.ui.View):
         """Cria embed da aba de habilidades"""
         character, player = await self.get_character_data()
         
-        embed = discord.Embed(
-            title=f"✨ Habilidades de {self.target_user.display_name}",
-            color=0x9b59b6
-        )
+        embed = discord.Embed(color=0x9b59b6)
         
         if character:
             faction = character['faction']
@@ -228,7 +344,6 @@ class ProfileView(discord.ui.View):
                 inline=False
             )
         
-        embed.set_thumbnail(url=self.target_user.display_avatar.url)
         embed.set_footer(text="Sistema de habilidades em expansão")
         
         return embed
@@ -237,10 +352,7 @@ class ProfileView(discord.ui.View):
         """Cria embed da aba de equipamento"""
         character, player = await self.get_character_data()
         
-        embed = discord.Embed(
-            title=f"🎒 Equipamento de {self.target_user.display_name}",
-            color=0xe67e22
-        )
+        embed = discord.Embed(color=0xe67e22)
         
         if character:
             faction = character['faction']
@@ -255,18 +367,10 @@ class ProfileView(discord.ui.View):
                     inline=False
                 )
                 
-                # Descrições dos tipos de kagune
-                kagune_descriptions = {
-                    'Rinkaku': '🐙 Tentáculos regenerativos com alta capacidade de cura',
-                    'Ukaku': '🦅 Cristais aéreos com alta velocidade e projéteis',
-                    'Koukaku': '🛡️ Armadura defensiva com alta resistência',
-                    'Bikaku': '🦂 Cauda versátil com equilíbrio entre ataque e defesa'
-                }
-                
-                if weapon in kagune_descriptions:
+                if weapon in KAGUNE_DESCRIPTIONS:
                     embed.add_field(
                         name="📋 Características",
-                        value=kagune_descriptions[weapon],
+                        value=KAGUNE_DESCRIPTIONS[weapon],
                         inline=False
                     )
             else:
@@ -278,18 +382,10 @@ class ProfileView(discord.ui.View):
                     inline=False
                 )
                 
-                # Descrições dos tipos de quinque
-                quinque_descriptions = {
-                    'Espada': '⚔️ Lâmina cortante para combate corpo a corpo',
-                    'Lança': '🔱 Arma de longo alcance com perfuração',
-                    'Martelo': '🔨 Arma pesada com impacto devastador',
-                    'Chicote': '🞭 Arma flexível para controle de área'
-                }
-                
-                if weapon in quinque_descriptions:
+                if weapon in QUINQUE_DESCRIPTIONS:
                     embed.add_field(
                         name="📋 Características",
-                        value=quinque_descriptions[weapon],
+                        value=QUINQUE_DESCRIPTIONS[weapon],
                         inline=False
                     )
             
@@ -308,70 +404,160 @@ class ProfileView(discord.ui.View):
                 inline=False
             )
         
-        embed.set_thumbnail(url=self.target_user.display_avatar.url)
         embed.set_footer(text="Equipamentos evoluem conforme seu personagem cresce")
         
         return embed
+
+    async def create_history_embed(self):
+        """Cria embed da aba de histórico de combates"""
+        user_id = self.target_user.id
+        db = self.bot.db
+        
+        embed = discord.Embed(color=0x992d22)
+        
+        stats = await db.get_combat_stats(user_id)
+        if not stats['total']:
+            embed.add_field(
+                name="⚔️ Nenhum combate",
+                value="Este jogador ainda não participou de combates.",
+                inline=False
+            )
+            return embed
+        
+        embed.add_field(
+            name="📊 Estatísticas",
+            value=f"**Combates:** {stats['total']}\n"
+                  f"**Vitórias:** {stats['wins']} | **Derrotas:** {stats['losses']} | **Empates:** {stats['draws']}\n"
+                  f"**Taxa de vitória:** {stats['win_rate']:.1f}%",
+            inline=False
+        )
+        
+        # Só as primeiras linhas são lidas; o iterador é fechado em seguida
+        recent = []
+        async with aclosing(db.iter_combats(user_id, batch=HISTORY_RECENT, decode=False)) as combats:
+            async for combat in combats:
+                opponent = combat['defender_id'] if combat['attacker_id'] == user_id else combat['attacker_id']
+                if combat['winner_id'] is None:
+                    result = "🤝 Empate"
+                elif combat['winner_id'] == user_id:
+                    result = "🏆 Vitória"
+                else:
+                    result = "💀 Derrota"
+                when = discord.utils.format_dt(datetime.fromtimestamp(combat['timestamp']), 'd')
+                recent.append(f"{result} contra <@{opponent}> • {when}")
+                if len(recent) >= HISTORY_RECENT:
+                    break
+        
+        embed.add_field(
+            name="🕒 Combates Recentes",
+            value="\n".join(recent),
+            inline=False
+        )
+        
+        rivals = await db.get_head_to_head(user_id, limit=HISTORY_RIVALS)
+        if rivals:
+            embed.add_field(
+                name="🎯 Rivais",
+                value="\n".join(
+                    f"<@{rival['opponent_id']}>: {rival['wins']}V / {rival['losses']}D / {rival['draws']}E"
+                    for rival in rivals
+                ),
+                inline=False
+            )
+        
+        embed.set_footer(text="Estatísticas calculadas sobre os meses de histórico mantidos")
+        
+        return embed
+
+class ProfileTabButton(discord.ui.DynamicItem[discord.ui.Button],
+                       template=r'perfil:(?P<tab>attributes|info|abilities|equipment|history|back):(?P<user_id>[0-9]+)'):
+    """Botão de aba do perfil; o custom_id guarda a aba e o dono do perfil"""
     
-    @discord.ui.button(label='📊 Atributos', style=discord.ButtonStyle.primary)
-    async def attributes_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        """Botão para aba de atributos"""
-        self.current_tab = "attributes"
-        embed = await self.create_attributes_embed()
-        await interaction.response.edit_message(embed=embed, view=self)
-    
-    @discord.ui.button(label='👤 Informações', style=discord.ButtonStyle.secondary)
-    async def info_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        """Botão para aba de informações"""
-        self.current_tab = "info"
-        embed = await self.create_info_embed()
-        
-        # Adicionar botão de editar informações se for o próprio usuário
-        if interaction.user.id == self.target_user.id:
-            edit_view = InfoEditView(self.target_user, self.bot, self)
-            await interaction.response.edit_message(embed=embed, view=edit_view)
+    def __init__(self, tab, user_id):
+        label, style = PROFILE_TABS.get(tab, ('🔙 Voltar', discord.ButtonStyle.secondary))
+        super().__init__(discord.ui.Button(
+            label=label,
+            style=style,
+            custom_id=f"perfil:{tab}:{user_id}"
+        ))
+        self.tab = tab
+        self.user_id = user_id
+    
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match['tab'], int(match['user_id']))
+    
+    async def callback(self, interaction: discord.Interaction):
+        """Troca a aba exibida na mensagem do perfil"""
+        await acknowledge(interaction, f"perfil:{self.tab}")
+        
+        target_user = await resolve_user(interaction, self.user_id)
+        renderer = ProfileRenderer(target_user, interaction.client)
+        
+        if self.tab == 'back':
+            # Voltar da edição mostra as informações com as abas normais
+            embed = await renderer.create_tab_embed('info')
+            view = ProfileView(self.user_id)
         else:
-            await interaction.response.edit_message(embed=embed, view=self)
-    
-    @discord.ui.button(label='✨ Habilidades', style=discord.ButtonStyle.secondary)
-    async def abilities_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        """Botão para aba de habilidades"""
-        self.current_tab = "abilities"
-        embed = await self.create_abilities_embed()
-        await interaction.response.edit_message(embed=embed, view=self)
-    
-    @discord.ui.button(label='🎒 Equipamento', style=discord.ButtonStyle.secondary)
-    async def equipment_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        """Botão para aba de equipamento"""
-        self.current_tab = "equipment"
-        embed = await self.create_equipment_embed()
-        await interaction.response.edit_message(embed=embed, view=self)
+            embed = await renderer.create_tab_embed(self.tab)
+            # Adicionar botão de editar informações se for o próprio usuário
+            if self.tab == 'info' and interaction.user.id == self.user_id:
+                view = InfoEditView(self.user_id)
+            else:
+                view = ProfileView(self.user_id)
+        
+        await interaction.edit_original_response(embed=embed, view=view)
 
-class InfoEditView(discord.ui.View):
-    """View para edição de informações pessoais"""
+class EditInfoButton(discord.ui.DynamicItem[discord.ui.Button], template=r'perfil:editar:(?P<user_id>[0-9]+)'):
+    """Botão para abrir o modal de edição das informações do perfil"""
     
-    def __init__(self, target_user, bot, profile_view):
-        super().__init__(timeout=300)
-        self.target_user = target_user
-        self.bot = bot
-        self.profile_view = profile_view
+    def __init__(self, user_id):
+        super().__init__(discord.ui.Button(
+            label='✏️ Editar Informações',
+            style=discord.ButtonStyle.success,
+            custom_id=f"perfil:editar:{user_id}"
+        ))
+        self.user_id = user_id
+    
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match['user_id']))
     
-    @discord.ui.button(label='✏️ Editar Informações', style=discord.ButtonStyle.success)
-    async def edit_info_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+    async def callback(self, interaction: discord.Interaction):
         """Botão para abrir modal de edição"""
-        if interaction.user.id != self.target_user.id:
+        # O modal precisa ser a primeira resposta, então não há defer aqui;
+        # a leitura costuma vir do cache de registros
+        if interaction.user.id != self.user_id:
             await interaction.response.send_message("❌ Você só pode editar suas próprias informações!", ephemeral=True)
             return
         
-        character = await self.bot.db.get_character(self.target_user.id)
-        modal = InfoEditModal(self.bot, character)
+        bot = interaction.client
+        character = await bot.db.get_character(self.user_id)
+        modal = InfoEditModal(bot, character)
         await interaction.response.send_modal(modal)
+        elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+        bot.button_latency["perfil:editar"].record(max(0.0, elapsed))
+
+class ProfileView(discord.ui.View):
+    """View persistente com as abas do perfil.
     
-    @discord.ui.button(label='🔙 Voltar', style=discord.ButtonStyle.secondary)
-    async def back_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        """Botão para voltar ao perfil normal"""
-        embed = await self.profile_view.create_info_embed()
-        await interaction.response.edit_message(embed=embed, view=self.profile_view)
+    Os botões são DynamicItems: o custom_id identifica o dono do perfil e a
+    aba, então a view não guarda estado, não expira e continua funcionando
+    depois de reiniciar o bot.
+    """
+    
+    def __init__(self, user_id):
+        super().__init__(timeout=None)
+        for tab in PROFILE_TABS:
+            self.add_item(ProfileTabButton(tab, user_id))
+
+class InfoEditView(discord.ui.View):
+    """View persistente para edição de informações pessoais"""
+    
+    def __init__(self, user_id):
+        super().__init__(timeout=None)
+        self.add_item(EditInfoButton(user_id))
+        self.add_item(ProfileTabButton('back', user_id))
 
 class InfoEditModal(discord.ui.Modal):
     """Modal para edição de informações pessoais"""
@@ -450,9 +636,94 @@ class InfoEditModal(discord.ui.Modal):
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+# Critérios aceitos pelo !ranking -> critério do banco de dados
+RANKING_CRITERIA = {
+    'xp': 'xp',
+    'nivel': 'level',
+    'nível': 'level',
+    'vitorias': 'wins',
+    'vitórias': 'wins',
+    'experiencia': 'experience',
+    'experiência': 'experience',
+}
+
+RANKING_TITLES = {
+    'xp': "📈 Ranking de XP",
+    'level': "🎯 Ranking de Nível",
+    'wins': "⚔️ Ranking de Vitórias",
+    'experience': "✨ Ranking de Experiência",
+}
+
+class LeaderboardView(discord.ui.View):
+    """View para navegar pelo ranking página a página"""
+    
+    def __init__(self, bot, criteria, page_size=10):
+        super().__init__(timeout=300)  # 5 minutos de timeout
+        self.bot = bot
+        self.criteria = criteria
+        self.page_size = page_size
+        self.page = 0
+        self.cursors = [None]  # Cursor de início de cada página já visitada
+        self.next_after = None
+    
+    async def create_page_embed(self):
+        """Cria embed da página atual do ranking"""
+        rows, self.next_after = await self.bot.db.get_leaderboard_page(
+            self.criteria, self.cursors[self.page], self.page_size
+        )
+        
+        lines = []
+        first_position = self.page * self.page_size + 1
+        for position, row in enumerate(rows, start=first_position):
+            if self.criteria == 'xp':
+                user_id, level, xp = row
+                lines.append(f"**#{position}** <@{user_id}> — Nível {level} · {xp:.0f} XP")
+            else:
+                user_id, name, faction, level, wins, losses, experience = row
+                faction_emoji = "👹" if faction == 'ghoul' else "🛡️"
+                lines.append(f"**#{position}** {faction_emoji} {name} — Nível {level} · "
+                             f"{wins}V/{losses}D · {experience} EXP")
+        
+        embed = discord.Embed(
+            title=RANKING_TITLES[self.criteria],
+            description="\n".join(lines) if lines else "Nenhum jogador no ranking ainda.",
+            color=0xffd700
+        )
+        embed.set_footer(text=f"Página {self.page + 1}")
+        
+        self.previous_button.disabled = self.page == 0
+        self.next_button.disabled = self.next_after is None
+        
+        return embed
+    
+    @discord.ui.button(label='◀️ Anterior', style=discord.ButtonStyle.secondary)
+    async def previous_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """Botão para a página anterior"""
+        await acknowledge(interaction, "ranking:anterior")
+        
+        if self.page > 0:
+            self.page -= 1
+        embed = await self.create_page_embed()
+        await interaction.edit_original_response(embed=embed, view=self)
+    
+    @discord.ui.button(label='Próxima ▶️', style=discord.ButtonStyle.primary)
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """Botão para a próxima página"""
+        await acknowledge(interaction, "ranking:proxima")
+        
+        if self.next_after is not None:
+            self.page += 1
+            del self.cursors[self.page:]
+            self.cursors.append(self.next_after)
+        embed = await self.create_page_embed()
+        await interaction.edit_original_response(embed=embed, view=self)
+
 async def setup_commands(bot):
     """Configura todos os comandos do bot"""
     
+    # Botões persistentes do perfil, válidos para qualquer mensagem já enviada
+    bot.add_dynamic_items(ProfileTabButton, EditInfoButton)
+    
     @bot.command(name='perfil', aliases=['profile', 'p'])
     async def show_profile(ctx, user: discord.User = None):
         """Mostra o perfil completo e interativo do jogador"""
@@ -462,13 +733,30 @@ async def setup_commands(bot):
             target_user = ctx.author
         
         # Criar view do perfil
-        view = ProfileView(target_user, bot)
+        view = ProfileView(target_user.id)
         
         # Criar embed inicial (atributos)
-        embed = await view.create_attributes_embed()
+        embed = await ProfileRenderer(target_user, bot).create_tab_embed('attributes')
         
         # Enviar mensagem com view
-        await ctx.send(embed=embed, view=view)
+        await bot.dispatcher.send(ctx, embed=embed, view=view)
+    
+    @bot.command(name='ranking', aliases=['rank', 'top'])
+    async def show_ranking(ctx, criterio: str = 'xp'):
+        """Mostra o ranking paginado (xp, nivel, vitorias ou experiencia)"""
+        criteria = RANKING_CRITERIA.get(criterio.lower())
+        if criteria is None:
+            embed = discord.Embed(
+                title="❌ Critério inválido",
+                description="Use `!ranking xp`, `!ranking nivel`, `!ranking vitorias` ou `!ranking experiencia`.",
+                color=0xff0000
+            )
+            await bot.dispatcher.send(ctx, embed=embed)
+            return
+        
+        view = LeaderboardView(bot, criteria)
+        embed = await view.create_page_embed()
+        await bot.dispatcher.send(ctx, embed=embed, view=view)
     
     @bot.command(name='definircanalxp')
     @commands.has_permissions(administrator=True)
@@ -511,7 +799,7 @@ async def setup_commands(bot):
                     color=0xff0000
                 )
         
-        await ctx.send(embed=embed)
+        await bot.dispatcher.send(ctx, embed=embed)
     
     @bot.command(name='canaisxp')
     @commands.has_permissions(administrator=True)
@@ -541,4 +829,51 @@ async def setup_commands(bot):
             )
             embed.set_footer(text=f"Total: {len(channels)} canais")
         
-        await ctx.send(embed=embed)
\ No newline at end of file
+        await bot.dispatcher.send(ctx, embed=embed)
+    
+    @bot.command(name='metricas', aliases=['metrics'])
+    @commands.has_permissions(administrator=True)
+    async def show_metrics(ctx):
+        """Mostra a latência dos botões, a fila de XP e o executor do banco"""
+        metrics = bot.metrics_snapshot()
+        
+        embed = discord.Embed(
+            title="📈 Métricas do Bot",
+            color=0x3498db
+        )
+        
+        # Confirmações acima de 2,5s estão a menos de 500ms do prazo do Discord
+        button_lines = []
+        for button, stats in metrics['buttons'].items():
+            near_deadline = stats['buckets']['<=3000ms'] + stats['buckets']['>3000ms']
+            button_lines.append(f"`{button}` {stats['count']} cliques · p95 {stats['p95_ms']:.0f}ms · "
+                                f"máx {stats['max_ms']:.0f}ms · >2,5s: {near_deadline}")
+        embed.add_field(
+            name="⏱️ Botões (prazo de 3s)",
+            value="\n".join(button_lines)[:1024] if button_lines else "Nenhum clique registrado.",
+            inline=False
+        )
+        
+        pipeline = metrics['xp_pipeline']
+        embed.add_field(
+            name="✨ Pipeline de XP",
+            value=f"**Fila:** {pipeline['queue_depth']}/{pipeline['max_queue']}\n"
+                  f"**Agrupados:** {pipeline['coalesced']} | **Descartados:** {pipeline['dropped']} | "
+                  f"**Falhas:** {pipeline['failed']}\n"
+                  f"**Latência:** p95 {pipeline['latency']['p95_ms']:.0f}ms · máx {pipeline['latency']['max_ms']:.0f}ms",
+            inline=False
+        )
+        
+        for lane, label in (('write', "✍️ Executor (escrita)"), ('read', "📖 Executor (leitura)")):
+            stats = metrics['executor'][lane]
+            embed.add_field(
+                name=label,
+                value=f"**Fila:** {stats['queue_depth']} | **Concluídas:** {stats['completed']} | "
+                      f"**Falhas:** {stats['failed']}\n"
+                      f"**Espera:** média {stats['avg_wait_ms']:.1f}ms · máx {stats['max_wait_ms']:.1f}ms",
+                inline=True
+            )
+        
+        embed.set_footer(text="Também registradas periodicamente no log (METRICS_LOG_INTERVAL)")
+        
+        await bot.dispatcher.send(ctx, embed=embed)
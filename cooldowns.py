@@ -0,0 +1,111 @@
+import asyncio
+import heapq
+import math
+import time
+from datetime import datetime
+
+from write_behind import WriteBehindLoop
+
+
+def parse_expiry(value):
+    """Converte expires_at salvo no banco (epoch ou ISO antigo) em epoch"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return datetime.fromisoformat(value).timestamp()
+
+
+class CooldownTracker:
+    """Cooldowns em memória: dicionário + min-heap ordenada por expiração.
+
+    Consultas são O(1) e sem I/O; entradas expiradas saem da heap de forma
+    preguiçosa. A tabela cooldowns só é atualizada periodicamente (e ao
+    encerrar), para que os cooldowns sobrevivam a reinícios.
+    """
+
+    def __init__(self, db, persist_interval=30.0):
+        self.db = db
+        self.persist_interval = persist_interval
+
+        self._expires = {}  # (user_id, command_type) -> epoch de expiração
+        self._heap = []     # (epoch, (user_id, command_type))
+        self._dirty = set()
+        self._persist_lock = asyncio.Lock()
+        self._writer = WriteBehindLoop(self.persist, persist_interval, "Erro ao gravar cooldowns")
+
+    def load(self, rows):
+        """Carrega (user_id, command_type, expires_at) vindos do banco"""
+        now = time.time()
+        for user_id, command_type, expires_at in rows:
+            expires_at = parse_expiry(expires_at)
+            key = (user_id, command_type)
+            if expires_at > now:
+                self._expires[key] = expires_at
+                self._heap.append((expires_at, key))
+            else:
+                self._dirty.add(key)
+        heapq.heapify(self._heap)
+
+    def start(self):
+        """Inicia a gravação periódica"""
+        self._writer.start()
+
+    async def stop(self):
+        """Para a gravação periódica e grava o estado atual"""
+        await self._writer.stop()
+
+    def set(self, user_id, command_type, seconds):
+        key = (user_id, command_type)
+        expires_at = time.time() + seconds
+        self._expires[key] = expires_at
+        heapq.heappush(self._heap, (expires_at, key))
+        self._dirty.add(key)
+
+        # Entradas substituídas ficam na heap; compacta se acumularem demais
+        if len(self._heap) > 2 * len(self._expires) + 64:
+            self._heap = [(exp, k) for k, exp in self._expires.items()]
+            heapq.heapify(self._heap)
+
+    def check(self, user_id, command_type):
+        """Retorna (em_cooldown, segundos_restantes)"""
+        now = time.time()
+        self.purge_expired(now)
+        expires_at = self._expires.get((user_id, command_type))
+        if expires_at is not None and now < expires_at:
+            return True, expires_at - now
+        return False, 0
+
+    def purge_expired(self, now=None):
+        """Remove da heap (e do dicionário) tudo que já expirou"""
+        if now is None:
+            now = time.time()
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            # Só remove se a entrada da heap ainda for a vigente
+            if self._expires.get(key) == expires_at:
+                del self._expires[key]
+                self._dirty.add(key)
+
+    async def persist(self):
+        """Grava na tabela cooldowns as entradas alteradas"""
+        async with self._persist_lock:
+            self.purge_expired()
+            if not self._dirty:
+                return
+
+            dirty, self._dirty = self._dirty, set()
+            upserts = []
+            deletes = []
+            for key in dirty:
+                expires_at = self._expires.get(key)
+                if expires_at is None:
+                    deletes.append(key)
+                else:
+                    upserts.append((key[0], key[1], math.ceil(expires_at)))
+
+            try:
+                await self.db._persist_cooldowns(upserts, deletes)
+            except Exception:
+                self._dirty |= dirty
+                raise
@@ -1,188 +1,325 @@
 import sqlite3
+import os
 import asyncio
 import logging
-from datetime import datetime, timedelta
-import json
+import time
+import itertools
+from contextlib import AsyncExitStack
+
+from db_executor import SQLiteExecutor
+from level_curve import LevelCurve
+from record_cache import RecordCache, MISSING
+from cooldowns import CooldownTracker
+from leaderboards import TopN, CHARACTER_CRITERIA, LEADERBOARD_COLUMNS, character_key
+from rank_index import RankIndex
+from xp_accumulator import XPAccumulator
+from combat_log_buffer import CombatLogBuffer
+from combat_partitions import CombatPartitions, month_key
+import combat_codec
+from statements import StatementRegistry
+from records import Character, Player, CHARACTER_COLUMNS, PLAYER_COLUMNS, PLAYER_FIELDS
+import migrations
+from migrations import to_epoch
+
+# Rankings paginados: critério -> (tabela, colunas de ordenação, colunas retornadas, filtro)
+LEADERBOARD_PAGES = {
+    'level': ('characters', ('level', 'experience'), LEADERBOARD_COLUMNS, "status = 'ativo'"),
+    'wins': ('characters', ('wins', 'experience'), LEADERBOARD_COLUMNS, "status = 'ativo'"),
+    'experience': ('characters', ('experience',), LEADERBOARD_COLUMNS, "status = 'ativo'"),
+    'xp': ('players', ('xp',), "user_id, level, xp", None),
+}
+
+# Colunas retornadas pelos UPDATEs, usadas para manter rankings e posições
+UPDATE_RETURNING = {
+    'characters': f"{LEADERBOARD_COLUMNS}, status",
+    'players': "level, xp",
+}
+
+# Colunas do log de combates, na ordem das linhas gravadas pelo buffer (após o id)
+COMBAT_LOG_COLUMNS = "attacker_id, defender_id, winner_id, combat_data, experience_gained, timestamp"
+
+# Combates movidos por transação ao migrar a tabela antiga para as partições
+COMBAT_MIGRATION_CHUNK = 5000
+
+# Pragmas aplicados a todas as conexões persistentes
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 134217728",
+    "PRAGMA busy_timeout = 5000",
+)
+
+# Jogador e personagem em uma única consulta (colunas na ordem de PLAYER_FIELDS + CHARACTER_FIELDS)
+PROFILE_SNAPSHOT_QUERY = f"""
+    SELECT {", ".join("p." + column for column in PLAYER_COLUMNS.split(", "))},
+           {", ".join("c." + column for column in CHARACTER_COLUMNS.split(", "))}
+    FROM players p
+    LEFT JOIN characters c ON c.user_id = p.user_id
+    WHERE p.user_id = ?
+"""
 
 class Database:
-    def __init__(self, db_path="tokyo_ghoul.db"):
+    def __init__(self, db_path="tokyo_ghoul.db", read_pool_size=4,
+                 xp_flush_interval=5.0, xp_flush_threshold=500,
+                 cache_size=2048, cache_ttl=300.0, lock_stripes=64,
+                 combat_flush_interval=2.0, combat_retention_months=9,
+                 combat_retention_policy='archive'):
         self.db_path = db_path
-        self.lock = asyncio.Lock()
+        self.read_pool_size = read_pool_size
+        
+        # Locks por usuário (listrados) para alterações de jogador/personagem,
+        # um lock separado para a configuração de canais; leituras não usam lock
+        self._user_locks = [asyncio.Lock() for _ in range(lock_stripes)]
+        self._channel_lock = asyncio.Lock()
+        
+        # UPDATEs dinâmicos validados contra as colunas reais das tabelas
+        self.statements = StatementRegistry()
+        
+        # Todo acesso ao SQLite passa pelo executor (fora do event loop)
+        self._executor = SQLiteExecutor(self._connect, read_workers=read_pool_size)
+        
+        # Cache read-through de personagens e jogadores por user_id
+        self._character_cache = RecordCache(cache_size, cache_ttl)
+        self._player_cache = RecordCache(cache_size, cache_ttl)
+        
+        # Rankings mantidos em memória (top N por critério)
+        self._leaderboards = {criteria: TopN() for criteria in CHARACTER_CRITERIA}
+        self._xp_leaderboard = TopN()
+        
+        # Posição de qualquer jogador: players por (level, xp), personagens por (wins, level)
+        self._player_ranks = RankIndex()
+        self._character_ranks = RankIndex()
+        
+        # Versão dos dados de cada usuário (players/characters), muda a cada escrita
+        self._data_versions = {}
+        self._data_version_counter = itertools.count(1)
+        
+        # Curva de níveis do sistema XP, calculada uma única vez
+        self.level_curve = LevelCurve()
+        
+        # Registro em memória dos canais XP: guild_id -> {channel_id}
+        self._xp_channels = {}
+        self._xp_channel_guilds = {}
+        
+        # Cooldowns em memória, gravados periodicamente
+        self.cooldowns = CooldownTracker(self)
+        
+        # XP passivo acumulado em memória e gravado em lote
+        self.xp_buffer = XPAccumulator(self, xp_flush_interval, xp_flush_threshold)
+        
+        # Log de combates codificado em binário e gravado em lote
+        self.combat_logs = CombatLogBuffer(self, combat_flush_interval)
+        
+        # Combates particionados por mês em arquivos à parte do banco principal
+        self.combat_partitions = CombatPartitions(
+            f"{os.path.splitext(db_path)[0]}_combats",
+            retention_months=combat_retention_months,
+            policy=combat_retention_policy
+        )
+    
+    def _connect(self, read_only=False):
+        """Abre uma conexão persistente já configurada"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        self.combat_partitions.configure(conn)
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
+        else:
+            conn.execute("PRAGMA journal_mode = WAL")
+        return conn
+    
+    def _user_lock(self, user_id):
+        """Lock da listra correspondente ao usuário"""
+        return self._user_locks[hash(user_id) % len(self._user_locks)]
+    
+    def get_executor_stats(self):
+        """Retorna profundidade das filas e tempos de espera do executor"""
+        return self._executor.stats()
+    
+    def get_cache_stats(self):
+        """Retorna acertos, falhas e remoções dos caches de registros"""
+        return {
+            'characters': self._character_cache.stats(),
+            'players': self._player_cache.stats(),
+        }
     
     async def initialize(self):
-        """Inicializa o banco de dados e cria as tabelas necessárias"""
-        async with self.lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Tabela de personagens
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS characters (
-                    user_id INTEGER PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    faction TEXT NOT NULL,
-                    level INTEGER DEFAULT 1,
-                    experience INTEGER DEFAULT 0,
-                    strength INTEGER DEFAULT 10,
-                    agility INTEGER DEFAULT 10,
-                    resistance INTEGER DEFAULT 10,
-                    health INTEGER DEFAULT 100,
-                    max_health INTEGER DEFAULT 100,
-                    stamina INTEGER DEFAULT 50,
-                    max_stamina INTEGER DEFAULT 50,
-                    kagune_quinque TEXT,
-                    wins INTEGER DEFAULT 0,
-                    losses INTEGER DEFAULT 0,
-                    created_at TEXT NOT NULL,
-                    last_combat TEXT,
-                    status TEXT DEFAULT 'ativo',
-                    ic_name TEXT DEFAULT '',
-                    age TEXT DEFAULT '',
-                    gender TEXT DEFAULT '',
-                    appearance TEXT DEFAULT '',
-                    backstory TEXT DEFAULT '',
-                    perception INTEGER DEFAULT 10,
-                    rc_control INTEGER DEFAULT 10,
-                    regeneration INTEGER DEFAULT 10,
-                    quinque_aptitude INTEGER DEFAULT 10,
-                    intellect INTEGER DEFAULT 10
-                )
-            """)
-            
-            # Tabela de combates
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS combat_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    attacker_id INTEGER NOT NULL,
-                    defender_id INTEGER NOT NULL,
-                    winner_id INTEGER,
-                    combat_data TEXT,
-                    experience_gained INTEGER,
-                    timestamp TEXT NOT NULL,
-                    FOREIGN KEY (attacker_id) REFERENCES characters (user_id),
-                    FOREIGN KEY (defender_id) REFERENCES characters (user_id)
-                )
-            """)
-            
-            # Tabela de cooldowns
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS cooldowns (
-                    user_id INTEGER,
-                    command_type TEXT,
-                    expires_at TEXT,
-                    PRIMARY KEY (user_id, command_type)
-                )
-            """)
-            
-            # Tabela de jogadores (sistema XP)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS players (
-                    user_id INTEGER PRIMARY KEY,
-                    level INTEGER DEFAULT 1,
-                    xp REAL DEFAULT 0.0,
-                    stat_points INTEGER DEFAULT 0,
-                    created_at TEXT NOT NULL
-                )
-            """)
-            
-            # Tabela de canais XP
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS xp_channels (
-                    channel_id INTEGER PRIMARY KEY,
-                    guild_id INTEGER NOT NULL,
-                    added_at TEXT NOT NULL
-                )
-            """)
-            
-            conn.commit()
-            conn.close()
-            logging.info("Banco de dados inicializado com sucesso!")
+        """Inicializa o banco de dados e aplica as migrações pendentes"""
+        self._executor.start()
+        applied = await self._executor.write(migrations.migrate)
+        if applied:
+            logging.info(f"Esquema migrado para a versão {applied[-1]}")
+        await self._executor.read(self.statements.load, tuple(UPDATE_RETURNING))
+        self.combat_partitions.scan()
+        migrated = await self._executor.write(migrations.migrate_partitions, self.combat_partitions)
+        if migrated:
+            logging.info(f"{len(migrated)} partições de combates migradas")
+        moved = await self._executor.write(self._move_legacy_combats)
+        if moved:
+            logging.info(f"{moved} combates movidos para as partições mensais")
+            # Devolve ao sistema o espaço que os combates ocupavam no banco principal
+            await self._executor.write(lambda conn: conn.execute("VACUUM"))
+        await self._executor.write(self.combat_partitions.apply_retention)
+        await self._executor.write(self.combat_partitions.ensure_indexes)
+        await self._load_xp_channels()
+        await self._load_cooldowns()
+        for criteria in CHARACTER_CRITERIA:
+            await self._fetch_leaderboard(criteria, 0)
+        await self._fetch_xp_leaderboard(0)
+        await self._load_rank_indexes()
+        self.xp_buffer.start()
+        self.combat_logs.start()
+        self.cooldowns.start()
+        logging.info("Banco de dados inicializado com sucesso!")
+    
+    async def close(self):
+        """Fecha todas as conexões persistentes"""
+        def checkpoint(conn):
+            # Incorpora o WAL ao arquivo principal antes de fechar
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        
+        # initialize() não rodou (ex.: login falhou antes do setup_hook)
+        if not self._executor.running:
+            return
+        
+        # Uma falha ao gravar um buffer não pode impedir os demais nem o desligamento
+        for name, buffer in (("XP acumulado", self.xp_buffer),
+                             ("log de combates", self.combat_logs),
+                             ("cooldowns", self.cooldowns)):
+            try:
+                await buffer.stop()
+            except Exception as e:
+                logging.error(f"Erro ao gravar {name} no encerramento: {e}")
+        
+        try:
+            await self._executor.write(checkpoint)
+        except Exception as e:
+            logging.error(f"Erro no checkpoint do WAL: {e}")
+        finally:
+            await self._executor.shutdown()
+        logging.info("Conexões do banco de dados encerradas")
     
     async def create_character(self, user_id, name, faction, kagune_quinque):
         """Cria um novo personagem"""
-        async with self.lock:
-            conn = sqlite3.connect(self.db_path)
+        def insert(conn):
             cursor = conn.cursor()
             
             try:
-                cursor.execute("""
+                cursor.execute(f"""
                     INSERT INTO characters 
                     (user_id, name, faction, kagune_quinque, created_at)
                     VALUES (?, ?, ?, ?, ?)
+                    RETURNING {LEADERBOARD_COLUMNS}, status
                 """, (user_id, name, faction, kagune_quinque,
- datetime.now().isoformat()))
+ int(time.time())))
                 
+                row = cursor.fetchone()
                 conn.commit()
-                return True
+                return row
             except sqlite3.IntegrityError:
-                return False
+                conn.rollback()
+                return None
+        
+        async with self._user_lock(user_id):
+            self._character_cache.invalidate(user_id)
+            try:
+                row = await self._executor.write(insert)
             finally:
-                conn.close()
+                self._character_cache.invalidate(user_id)
+            
+            if row is None:
+                return False
+            self._track_character(row)
+            return True
     
     async def get_character(self, user_id):
         """Obtém dados do personagem"""
-        async with self.lock:
-            conn = sqlite3.connect(self.db_path)
+        def query(conn):
             cursor = conn.cursor()
+            cursor.row_factory = Character.from_row
             
-            cursor.execute("SELECT * FROM characters WHERE user_id = ?", (user_id,))
-            result = cursor.fetchone()
-            conn.close()
-            
-            if result:
-                columns = [desc[0] for desc in cursor.description]
-                return dict(zip(columns, result))
-            return None
+            cursor.execute(f"SELECT {CHARACTER_COLUMNS} FROM characters WHERE user_id = ?", (user_id,))
+            return cursor.fetchone()
+        
+        character = self._character_cache.get(user_id)
+        if character is not MISSING:
+            return character
+        
+        token = self._character_cache.token(user_id)
+        character = await self._executor.read(query)
+        self._character_cache.put(user_id, character, token)
+        return character
     
     async def update_character(self, user_id, **kwargs):
         """Atualiza dados do personagem"""
-        async with self.lock:
-            if not kwargs:
-                return False
-            
-            conn = sqlite3.connect(self.db_path)
+        if not kwargs:
+            return False
+        
+        async with self._user_lock(user_id):
+            return await self._update_character(user_id, kwargs)
+    
+    async def _update_character(self, user_id, kwargs):
+        """Atualiza o personagem (o chamador deve segurar o lock do usuário)"""
+        sql, columns = self.statements.update('characters', kwargs, UPDATE_RETURNING['characters'])
+        values = self.statements.params(columns, kwargs, user_id)
+        
+        def update(conn):
             cursor = conn.cursor()
             
-            # Construir query dinamicamente
-            set_clause = ", ".join([f"{key} = ?" for key in kwargs.keys()])
-            values = list(kwargs.values()) + [user_id]
-            
-            cursor.execute(f"UPDATE characters SET {set_clause} WHERE user_id = ?", values)
+            cursor.execute(sql, values)
             
-            success = cursor.rowcount > 0
+            row = cursor.fetchone()
             conn.commit()
-            conn.close()
             
-            return success
+            return row
+        
+        previous = self._character_cache.invalidate(user_id)
+        try:
+            row = await self._executor.write(update)
+        finally:
+            self._character_cache.invalidate(user_id)
+        
+        success = row is not None
+        if success:
+            self._track_character(row)
+        
+        # Write-through: o registro em cache passa a refletir a escrita
+        if success and previous is not None:
+            previous.update(kwargs)
+            self._character_cache.write(user_id, previous)
+        return success
     
     async def add_experience(self, user_id, exp_gain):
         """Adiciona experiência e verifica se subiu de nível"""
-        character = await self.get_character(user_id)
-        if not character:
-            return False, 0
-        
-        new_exp = character['experience'] + exp_gain
-        old_level = character['level']
-        new_level = self._calculate_level(new_exp)
-        
-        update_data = {'experience': new_exp}
-        
-        # Se subiu de nível, aumentar atributos
-        if new_level > old_level:
-            levels_gained = new_level - old_level
-            update_data.update({
-                'level': new_level,
-                'strength': character['strength'] + levels_gained * 2,
-                'agility': character['agility'] + levels_gained * 2,
-                'resistance': character['resistance'] + levels_gained * 2,
-                'max_health': character['max_health'] + levels_gained * 10
-            })
-            # Curar completamente ao subir de nível
-            update_data['health'] = update_data['max_health']
-        
-        await self.update_character(user_id, **update_data)
-        levels_gained = new_level - old_level if new_level > old_level else 0
-        return new_level > old_level, levels_gained
+        async with self._user_lock(user_id):
+            character = await self.get_character(user_id)
+            if not character:
+                return False, 0
+            
+            new_exp = character['experience'] + exp_gain
+            old_level = character['level']
+            new_level = self._calculate_level(new_exp)
+            
+            update_data = {'experience': new_exp}
+            
+            # Se subiu de nível, aumentar atributos
+            if new_level > old_level:
+                levels_gained = new_level - old_level
+                update_data.update({
+                    'level': new_level,
+                    'strength': character['strength'] + levels_gained * 2,
+                    'agility': character['agility'] + levels_gained * 2,
+                    'resistance': character['resistance'] + levels_gained * 2,
+                    'max_health': character['max_health'] + levels_gained * 10
+                })
+                # Curar completamente ao subir de nível
+                update_data['health'] = update_data['max_health']
+            
+            await self._update_character(user_id, update_data)
+            levels_gained = new_level - old_level if new_level > old_level else 0
+            return new_level > old_level, levels_gained
     
     def _calculate_level(self, experience):
         """Calcula o nível baseado na experiência"""
@@ -195,277 +332,831 @@ class Database:
         return (level - 1) ** 2 * 100
     
     async def log_combat(self, attacker_id, defender_id, winner_id, combat_data, exp_gained):
-        """Registra um combate no log"""
-        async with self.lock:
-            conn = sqlite3.connect(self.db_path)
+        """Registra um combate no log (gravado em lote pelo buffer de combates)"""
+        # O histórico dos dois jogadores muda: invalida o perfil renderizado
+        self._bump_data_version(attacker_id)
+        self._bump_data_version(defender_id)
+        self.combat_logs.add((attacker_id, defender_id, winner_id,
+                              combat_codec.encode(combat_data), exp_gained,
+                              int(time.time())))
+    
+    async def insert_combat_logs(self, rows):
+        """Grava nas partições mensais: [(attacker_id, defender_id, winner_id, combat_data, exp, timestamp)]"""
+        partitions = self.combat_partitions
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(month_key(row[5]), []).append(row)
+        
+        def insert(conn):
             cursor = conn.cursor()
             
-            cursor.execute("""
-                INSERT INTO combat_logs 
-                (attacker_id, defender_id, winner_id, combat_data, experience_gained, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (attacker_id, defender_id, winner_id, 
-                  json.dumps(combat_data), exp_gained, datetime.now().isoformat()))
+            # ATTACH precisa vir antes da transação
+            active = partitions.months()
+            aliases = {month: partitions.attach(conn, month, create=True) for month in by_month}
+            
+            # Todos os meses num único commit: se algo falhar, nada é gravado e
+            # o buffer pode recolocar o lote inteiro sem duplicar combates
+            for month, group in by_month.items():
+                # IDs da sequência do banco principal: únicos entre partições
+                cursor.execute("""
+                    UPDATE sequences SET value = value + ? WHERE name = 'combat_logs'
+                    RETURNING value
+                """, (len(group),))
+                first_id = cursor.fetchone()[0] - len(group) + 1
+                
+                cursor.executemany(f"""
+                    INSERT INTO {aliases[month]}.combat_logs (id, {COMBAT_LOG_COLUMNS})
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, [(first_id + i, *row) for i, row in enumerate(group)])
             
             conn.commit()
-            conn.close()
+            
+            # Virada de mês: aplica a retenção às partições antigas
+            if any(month not in active for month in by_month):
+                partitions.apply_retention(conn)
+        
+        await self._executor.write(insert)
     
-    async def set_cooldown(self, user_id, command_type, duration_minutes):
-        """Define um cooldown para um usuário"""
-        async with self.lock:
-            expires_at = datetime.now() + timedelta(minutes=duration_minutes)
+    def _move_legacy_combats(self, conn):
+        """Move em blocos os combates da tabela antiga para as partições (thread de escrita)"""
+        partitions = self.combat_partitions
+        cursor = conn.cursor()
+        moved = 0
+        
+        while True:
+            cursor.execute(f"""
+                SELECT id, {COMBAT_LOG_COLUMNS} FROM combat_logs
+                ORDER BY id LIMIT ?
+            """, (COMBAT_MIGRATION_CHUNK,))
+            rows = cursor.fetchall()
+            if not rows:
+                return moved
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            # Linhas antigas podem ter timestamp ISO: as partições usam epoch
+            by_month = {}
+            for row in rows:
+                timestamp = to_epoch(row[6])
+                by_month.setdefault(month_key(timestamp), []).append((*row[:6], timestamp))
             
-            cursor.execute("""
-                INSERT OR REPLACE INTO cooldowns (user_id, command_type, expires_at)
-                VALUES (?, ?, ?)
-            """, (user_id, command_type, expires_at.isoformat()))
+            # OR IGNORE: se uma execução anterior parou no meio, o bloco é repetido
+            for month, group in by_month.items():
+                alias = partitions.attach(conn, month, create=True)
+                cursor.executemany(f"""
+                    INSERT OR IGNORE INTO {alias}.combat_logs (id, {COMBAT_LOG_COLUMNS})
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, group)
+                conn.commit()
             
+            cursor.execute("DELETE FROM combat_logs WHERE id <= ?", (rows[-1][0],))
+            cursor.execute("""
+                UPDATE sequences SET value = MAX(value, ?) WHERE name = 'combat_logs'
+            """, (rows[-1][0],))
             conn.commit()
-            conn.close()
+            moved += len(rows)
     
-    async def check_cooldown(self, user_id, command_type):
-        """Verifica se um usuário está em cooldown"""
-        async with self.lock:
-            conn = sqlite3.connect(self.db_path)
+    async def get_combat_log(self, combat_id):
+        """Obtém um combate pelo ID, procurando nas partições do mês mais recente ao mais antigo"""
+        partitions = self.combat_partitions
+        
+        def query(conn):
             cursor = conn.cursor()
             
-            cursor.execute("""
-                SELECT expires_at FROM cooldowns 
-                WHERE user_id = ? AND command_type = ?
-            """, (user_id, command_type))
+            for month in partitions.months():
+                alias = partitions.attach(conn, month)
+                if alias is None:
+                    continue
+                cursor.execute(f"""
+                    SELECT id, {COMBAT_LOG_COLUMNS} FROM {alias}.combat_logs WHERE id = ?
+                """, (combat_id,))
+                row = cursor.fetchone()
+                if row:
+                    columns = [desc[0] for desc in cursor.description]
+                    return dict(zip(columns, row))
+            return None
+        
+        combat = await self._executor.read(query)
+        if combat:
+            combat['combat_data'] = combat_codec.decode(combat['combat_data'])
+        return combat
+    
+    async def iter_combats(self, user_id, since=None, batch=50, decode=True):
+        """Itera pelos combates do jogador, do mais recente ao mais antigo, em lotes de `batch`"""
+        partitions = self.combat_partitions
+        since = to_epoch(since)
+        time_filter = "AND timestamp >= :since" if since is not None else ""
+        
+        def query(conn, month, before):
+            alias = partitions.attach(conn, month)
+            if alias is None:
+                return []
+            cursor = conn.cursor()
+            
+            # Um braço por índice (atacante, defensor), ambos já ordenados por id
+            cursor.execute(f"""
+                SELECT * FROM (
+                    SELECT id, {COMBAT_LOG_COLUMNS} FROM {alias}.combat_logs
+                    WHERE attacker_id = :user AND id < :before {time_filter}
+                    ORDER BY id DESC LIMIT :batch
+                )
+                UNION ALL
+                SELECT * FROM (
+                    SELECT id, {COMBAT_LOG_COLUMNS} FROM {alias}.combat_logs
+                    WHERE defender_id = :user AND attacker_id != :user AND id < :before {time_filter}
+                    ORDER BY id DESC LIMIT :batch
+                )
+                ORDER BY id DESC LIMIT :batch
+            """, {'user': user_id, 'before': before, 'since': since, 'batch': batch})
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchmany(batch)]
+        
+        await self.combat_logs.flush()
+        for month in partitions.months(since):
+            # Keyset: cada lote começa abaixo do último id lido, sem OFFSET
+            before = float('inf')
+            while True:
+                combats = await self._executor.read(query, month, before)
+                for combat in combats:
+                    if decode:
+                        combat['combat_data'] = combat_codec.decode(combat['combat_data'])
+                    yield combat
+                if len(combats) < batch:
+                    break
+                before = combats[-1]['id']
+    
+    async def get_combat_stats(self, user_id, since=None):
+        """Totais de combates, vitórias, derrotas, empates e taxa de vitória do jogador"""
+        partitions = self.combat_partitions
+        since = to_epoch(since)
+        time_filter = "AND timestamp >= :since" if since is not None else ""
+        
+        def query(conn):
+            cursor = conn.cursor()
             
-            result = cursor.fetchone()
-            conn.close()
+            total = wins = draws = 0
+            for month in partitions.months(since):
+                alias = partitions.attach(conn, month)
+                if alias is None:
+                    continue
+                cursor.execute(f"""
+                    SELECT COUNT(*),
+                           COALESCE(SUM(winner_id = :user), 0),
+                           COALESCE(SUM(winner_id IS NULL), 0)
+                    FROM (
+                        SELECT winner_id FROM {alias}.combat_logs
+                        WHERE attacker_id = :user {time_filter}
+                        UNION ALL
+                        SELECT winner_id FROM {alias}.combat_logs
+                        WHERE defender_id = :user AND attacker_id != :user {time_filter}
+                    )
+                """, {'user': user_id, 'since': since})
+                month_total, month_wins, month_draws = cursor.fetchone()
+                total += month_total
+                wins += month_wins
+                draws += month_draws
+            return total, wins, draws
+        
+        await self.combat_logs.flush()
+        total, wins, draws = await self._executor.read(query)
+        return {
+            'total': total,
+            'wins': wins,
+            'losses': total - wins - draws,
+            'draws': draws,
+            'win_rate': wins / total * 100 if total else 0.0,
+        }
+    
+    async def get_head_to_head(self, user_id, opponent_id=None, limit=None, since=None):
+        """Confrontos diretos: [{'opponent_id', 'total', 'wins', 'losses', 'draws'}], mais frequentes primeiro"""
+        partitions = self.combat_partitions
+        since = to_epoch(since)
+        time_filter = "AND timestamp >= :since" if since is not None else ""
+        opponent_filter = "WHERE opponent_id = :opponent" if opponent_id is not None else ""
+        
+        def query(conn):
+            cursor = conn.cursor()
             
-            if result:
-                expires_at = datetime.fromisoformat(result[0])
-                if datetime.now() < expires_at:
-                    remaining = expires_at - datetime.now()
-                    return True, remaining.total_seconds()
-                else:
-                    # Cooldown expirado, remover
-                    await self._remove_cooldown(user_id, command_type)
+            # Agrupado no SQL por partição; só a soma entre meses fica em Python
+            totals = {}
+            for month in partitions.months(since):
+                alias = partitions.attach(conn, month)
+                if alias is None:
+                    continue
+                cursor.execute(f"""
+                    SELECT opponent_id, COUNT(*),
+                           COALESCE(SUM(winner_id = :user), 0),
+                           COALESCE(SUM(winner_id IS NULL), 0)
+                    FROM (
+                        SELECT defender_id AS opponent_id, winner_id FROM {alias}.combat_logs
+                        WHERE attacker_id = :user {time_filter}
+                        UNION ALL
+                        SELECT attacker_id AS opponent_id, winner_id FROM {alias}.combat_logs
+                        WHERE defender_id = :user AND attacker_id != :user {time_filter}
+                    )
+                    {opponent_filter}
+                    GROUP BY opponent_id
+                """, {'user': user_id, 'opponent': opponent_id, 'since': since})
+                for opponent, total, wins, draws in cursor.fetchall():
+                    entry = totals.setdefault(opponent, [0, 0, 0])
+                    entry[0] += total
+                    entry[1] += wins
+                    entry[2] += draws
+            return totals
+        
+        await self.combat_logs.flush()
+        totals = await self._executor.read(query)
+        results = [
+            {'opponent_id': opponent, 'total': total, 'wins': wins,
+             'losses': total - wins - draws, 'draws': draws}
+            for opponent, (total, wins, draws) in totals.items()
+        ]
+        results.sort(key=lambda entry: (-entry['total'], entry['opponent_id']))
+        return results[:limit] if limit is not None else results
+    
+    async def set_cooldown(self, user_id, command_type, duration_minutes):
+        """Define um cooldown para um usuário"""
+        self.cooldowns.set(user_id, command_type, duration_minutes * 60)
+    
+    async def check_cooldown(self, user_id, command_type):
+        """Verifica se um usuário está em cooldown (em memória, sem I/O)"""
+        return self.cooldowns.check(user_id, command_type)
+    
+    async def _load_cooldowns(self):
+        """Carrega os cooldowns ainda válidos para a memória"""
+        now = int(time.time())
+        
+        def prune(conn):
+            # Pelo índice de expiração: só as linhas vencidas são lidas e apagadas
+            conn.execute("DELETE FROM cooldowns WHERE expires_at <= ?", (now,))
+            conn.commit()
+        
+        def query(conn):
+            cursor = conn.cursor()
             
-            return False, 0
+            cursor.execute("SELECT user_id, command_type, expires_at FROM cooldowns WHERE expires_at > ?", (now,))
+            return cursor.fetchall()
+        
+        await self._executor.write(prune)
+        self.cooldowns.load(await self._executor.read(query))
     
-    async def _remove_cooldown(self, user_id, command_type):
-        """Remove um cooldown expirado"""
-        async with self.lock:
-            conn = sqlite3.connect(self.db_path)
+    async def _persist_cooldowns(self, upserts, deletes):
+        """Grava cooldowns alterados: upserts (user_id, tipo, epoch) e deletes (user_id, tipo)"""
+        def write(conn):
             cursor = conn.cursor()
             
-            cursor.execute("""
+            cursor.executemany("""
+                INSERT OR REPLACE INTO cooldowns (user_id, command_type, expires_at)
+                VALUES (?, ?, ?)
+            """, upserts)
+            cursor.executemany("""
                 DELETE FROM cooldowns 
                 WHERE user_id = ? AND command_type = ?
-            """, (user_id, command_type))
+            """, deletes)
             
             conn.commit()
-            conn.close()
+        
+        await self._executor.write(write)
     
-    async def get_leaderboard(self, criteria='level', limit=10):
-        """Obtém ranking de jogadores"""
-        async with self.lock:
-            conn = sqlite3.connect(self.db_path)
+    def _track_character(self, row):
+        """Atualiza os rankings em memória com (colunas do ranking..., status)"""
+        user_id, status = row[0], row[-1]
+        self._bump_data_version(user_id)
+        row = tuple(row[:-1])
+        for criteria, board in self._leaderboards.items():
+            if status == 'ativo':
+                board.update(user_id, character_key(criteria, row), row)
+            else:
+                board.remove(user_id)
+        
+        if status == 'ativo':
+            self._character_ranks.update(user_id, row[4], row[3])
+        else:
+            self._character_ranks.remove(user_id)
+    
+    def _track_player(self, user_id, level, xp):
+        """Atualiza o ranking de XP em memória"""
+        self._bump_data_version(user_id)
+        self._xp_leaderboard.update(user_id, (xp,), (user_id, level, xp))
+        self._player_ranks.update(user_id, level, xp)
+    
+    def _bump_data_version(self, user_id):
+        self._data_versions[user_id] = next(self._data_version_counter)
+    
+    async def get_data_version(self, user_id):
+        """Versão atual dos dados do usuário; muda a cada escrita em players/characters (sem I/O)"""
+        return self._data_versions.get(user_id, 0)
+    
+    async def _load_rank_indexes(self):
+        """Carrega as posições de todos os jogadores e personagens ativos"""
+        def query(conn):
             cursor = conn.cursor()
             
-            valid_criteria = ['level', 'wins', 'experience']
-            if criteria not in valid_criteria:
-                criteria = 'level'
+            cursor.execute("SELECT user_id, level, xp FROM players")
+            players = cursor.fetchall()
+            cursor.execute("SELECT user_id, wins, level FROM characters WHERE status = 'ativo'")
+            characters = cursor.fetchall()
+            
+            return players, characters
+        
+        players, characters = await self._executor.read(query)
+        self._player_ranks.load(players)
+        self._character_ranks.load(characters)
+    
+    async def get_player_rank(self, user_id):
+        """Posição no ranking de XP: {'rank', 'total', 'percentile'} ou None (sem I/O)"""
+        return self._player_ranks.rank(user_id)
+    
+    async def get_character_rank(self, user_id):
+        """Posição no ranking de vitórias: {'rank', 'total', 'percentile'} ou None (sem I/O)"""
+        return self._character_ranks.rank(user_id)
+    
+    async def _fetch_leaderboard(self, criteria, limit):
+        """Lê um ranking de personagens pelo índice e recarrega o top N"""
+        board = self._leaderboards[criteria]
+        order = ", ".join(f"{column} DESC" for column in CHARACTER_CRITERIA[criteria])
+        
+        def query(conn):
+            cursor = conn.cursor()
             
             cursor.execute(f"""
-                SELECT user_id, name, faction, level, wins, losses, experience
+                SELECT {LEADERBOARD_COLUMNS}
                 FROM characters 
                 WHERE status = 'ativo'
-                ORDER BY {criteria} DESC, experience DESC
+                ORDER BY {order}, user_id DESC
                 LIMIT ?
-            """, (limit,))
+            """, (max(limit, board.capacity),))
             
-            results = cursor.fetchall()
-            conn.close()
+            return cursor.fetchall()
+        
+        version = board.version
+        results = await self._executor.read(query)
+        board.load([(character_key(criteria, row), row[0], row) for row in results], version)
+        return results[:limit]
+    
+    async def _fetch_xp_leaderboard(self, limit):
+        """Lê o ranking de XP pelo índice e recarrega o top N"""
+        board = self._xp_leaderboard
+        
+        def query(conn):
+            cursor = conn.cursor()
             
+            cursor.execute("""
+                SELECT user_id, level, xp
+                FROM players
+                ORDER BY xp DESC, user_id DESC
+                LIMIT ?
+            """, (max(limit, board.capacity),))
+            
+            return cursor.fetchall()
+        
+        version = board.version
+        results = await self._executor.read(query)
+        board.load([((row[2],), row[0], row) for row in results], version)
+        return results[:limit]
+    
+    async def get_leaderboard(self, criteria='level', limit=10):
+        """Obtém ranking de jogadores"""
+        if criteria not in CHARACTER_CRITERIA:
+            criteria = 'level'
+        
+        # Respondido da memória sempre que possível
+        results = self._leaderboards[criteria].top(limit)
+        if results is not None:
+            return results
+        
+        return await self._fetch_leaderboard(criteria, limit)
+    
+    async def get_xp_leaderboard(self, limit=10):
+        """Obtém ranking de XP: [(user_id, level, xp)]"""
+        results = self._xp_leaderboard.top(limit)
+        if results is not None:
             return results
+        
+        # O banco precisa refletir o XP ainda acumulado em memória
+        await self.xp_buffer.flush()
+        
+        return await self._fetch_xp_leaderboard(limit)
+    
+    async def get_leaderboard_page(self, criteria='level', after=None, limit=10):
+        """Obtém uma página do ranking por keyset.
+        
+        `after` é o cursor devolvido pela página anterior (None para a
+        primeira). Retorna (linhas, cursor da próxima página ou None). A
+        primeira página vem do top N em memória (recarregado do banco se
+        estiver desatualizado); as demais custam o mesmo em qualquer
+        profundidade, pois a busca parte do índice. O ranking de XP em
+        memória já inclui o XP ainda no acumulador, então ele é gravado
+        antes de ler do banco para que todas as páginas vejam os mesmos
+        valores.
+        """
+        if criteria not in LEADERBOARD_PAGES:
+            criteria = 'level'
+        table, order_columns, columns, condition = LEADERBOARD_PAGES[criteria]
+        
+        key_columns = order_columns + ('user_id',)
+        names = [column.strip() for column in columns.split(",")]
+        key_positions = [names.index(column) for column in key_columns]
+        
+        conditions = [condition] if condition else []
+        params = []
+        if after is not None:
+            conditions.append(f"({', '.join(key_columns)}) < ({', '.join('?' * len(key_columns))})")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = ", ".join(f"{column} DESC" for column in key_columns)
+        
+        def query(conn):
+            cursor = conn.cursor()
+            
+            cursor.execute(f"""
+                SELECT {columns}
+                FROM {table}
+                {where}
+                ORDER BY {order}
+                LIMIT ?
+            """, params + [limit + 1])
+            
+            return cursor.fetchall()
+        
+        if after is not None:
+            if table == 'players':
+                await self.xp_buffer.flush()
+            results = await self._executor.read(query)
+        elif table == 'players':
+            results = self._xp_leaderboard.top(limit + 1)
+            if results is None:
+                await self.xp_buffer.flush()
+                results = await self._fetch_xp_leaderboard(limit + 1)
+        else:
+            results = self._leaderboards[criteria].top(limit + 1)
+            if results is None:
+                results = await self._fetch_leaderboard(criteria, limit + 1)
+        
+        if len(results) <= limit:
+            return results, None
+        results = results[:limit]
+        next_after = tuple(results[-1][position] for position in key_positions)
+        return results, next_after
     
     async def create_player(self, user_id):
         """Cria um novo jogador no sistema XP"""
-        async with self.lock:
-            conn = sqlite3.connect(self.db_path)
+        def insert(conn):
             cursor = conn.cursor()
             
             try:
                 cursor.execute("""
                     INSERT INTO players (user_id, created_at)
                     VALUES (?, ?)
-                """, (user_id, datetime.now().isoformat()))
+                    RETURNING level, xp
+                """, (user_id, int(time.time())))
                 
+                row = cursor.fetchone()
                 conn.commit()
-                return True
+                return row
             except sqlite3.IntegrityError:
-                return False
+                conn.rollback()
+                return None
+        
+        async with self._user_lock(user_id):
+            self._player_cache.invalidate(user_id)
+            try:
+                row = await self._executor.write(insert)
             finally:
-                conn.close()
+                self._player_cache.invalidate(user_id)
+            
+            if row is None:
+                return False
+            self._track_player(user_id, *row)
+            return True
     
     async def get_player(self, user_id):
         """Obtém dados do jogador"""
-        async with self.lock:
-            conn = sqlite3.connect(self.db_path)
+        def query(conn):
             cursor = conn.cursor()
+            cursor.row_factory = Player.from_row
             
-            cursor.execute("SELECT * FROM players WHERE user_id = ?", (user_id,))
-            result = cursor.fetchone()
-            conn.close()
+            cursor.execute(f"SELECT {PLAYER_COLUMNS} FROM players WHERE user_id = ?", (user_id,))
+            return cursor.fetchone()
+        
+        player = self._player_cache.get(user_id)
+        if player is MISSING:
+            token = self._player_cache.token(user_id)
+            player = await self._executor.read(query)
+            self._player_cache.put(user_id, player, token)
+        
+        # XP ainda não gravado pelo acumulador prevalece sobre o banco
+        buffered = self.xp_buffer.peek(user_id)
+        if player and buffered:
+            player['level'], player['xp'], player['stat_points'] = buffered
+        return player
+    
+    async def get_profile_snapshot(self, user_id):
+        """Obtém (personagem, jogador) em uma consulta, criando o jogador se preciso"""
+        def split(cursor, row):
+            # Colunas do jogador primeiro; sem personagem, as demais vêm NULL
+            start = len(PLAYER_FIELDS)
+            player = Player(*row[:start])
+            character = Character(*row[start:]) if row[start] is not None else None
+            return character, player
+        
+        def query(conn):
+            cursor = conn.cursor()
+            cursor.row_factory = split
             
-            if result:
-                columns = [desc[0] for desc in cursor.description]
-                return dict(zip(columns, result))
-            return None
+            cursor.execute(PROFILE_SNAPSHOT_QUERY, (user_id,))
+            return cursor.fetchone()
+        
+        def upsert(conn):
+            cursor = conn.cursor()
+            
+            # Criação preguiçosa: só retorna linha se o jogador foi inserido agora
+            cursor.execute("""
+                INSERT INTO players (user_id, created_at)
+                VALUES (?, ?)
+                ON CONFLICT (user_id) DO NOTHING
+                RETURNING level, xp
+            """, (user_id, int(time.time())))
+            created = cursor.fetchone()
+            
+            cursor.row_factory = split
+            cursor.execute(PROFILE_SNAPSHOT_QUERY, (user_id,))
+            snapshot = cursor.fetchone()
+            
+            conn.commit()
+            return created, snapshot
+        
+        character = self._character_cache.get(user_id)
+        player = self._player_cache.get(user_id)
+        
+        if character is MISSING or player is MISSING or player is None:
+            character_token = self._character_cache.token(user_id)
+            player_token = self._player_cache.token(user_id)
+            snapshot = await self._executor.read(query)
+            
+            if snapshot is not None:
+                character, player = snapshot
+                self._character_cache.put(user_id, character, character_token)
+                self._player_cache.put(user_id, player, player_token)
+            else:
+                self._player_cache.invalidate(user_id)
+                try:
+                    created, (character, player) = await self._executor.write(upsert)
+                finally:
+                    self._player_cache.invalidate(user_id)
+                if created:
+                    self._track_player(user_id, *created)
+        
+        # XP ainda não gravado pelo acumulador prevalece sobre o banco
+        buffered = self.xp_buffer.peek(user_id)
+        if buffered:
+            player['level'], player['xp'], player['stat_points'] = buffered
+        return character, player
     
     async def add_xp(self, user_id, xp_amount):
         """Adiciona XP ao jogador e verifica level up"""
-        player = await self.get_player(user_id)
-        if not player:
-            # Criar jogador se não existir
-            await self.create_player(user_id)
-            player = await self.get_player(user_id)
-        
-        if not player:
-            return False, 1, 1, 0
-        
-        old_level = player['level']
-        new_xp = player['xp'] + xp_amount
-        new_level = self._calculate_level_from_xp(new_xp)
-        
-        update_data = {'xp': new_xp}
-        stat_points_gained = 0
-        
-        # Se subiu de nível
-        if new_level > old_level:
-            levels_gained = new_level - old_level
-            stat_points_gained = levels_gained * 3  # 3 pontos por nível
-            update_data.update({
-                'level': new_level,
-                'stat_points': player['stat_points'] + stat_points_gained
-            })
-        
-        await self.update_player(user_id, **update_data)
-        return new_level > old_level, old_level, new_level, stat_points_gained
+        def upsert(conn):
+            cursor = conn.cursor()
+            
+            # Cria o jogador (se preciso) e soma o XP em um único comando
+            cursor.execute("""
+                INSERT INTO players (user_id, xp, created_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT (user_id) DO UPDATE SET xp = xp + excluded.xp
+                RETURNING level, xp
+            """, (user_id, xp_amount, int(time.time())))
+            
+            old_level, new_xp = cursor.fetchone()
+            new_level = self._calculate_level_from_xp(new_xp)
+            stat_points_gained = 0
+            
+            # Se subiu de nível (mesma transação, na thread de escrita)
+            if new_level > old_level:
+                levels_gained = new_level - old_level
+                stat_points_gained = levels_gained * 3  # 3 pontos por nível
+                cursor.execute("""
+                    UPDATE players SET level = ?, stat_points = stat_points + ?
+                    WHERE user_id = ?
+                """, (new_level, stat_points_gained, user_id))
+            
+            conn.commit()
+            return new_xp, (new_level > old_level, old_level, new_level, stat_points_gained)
+        
+        await self.xp_buffer.forget(user_id)
+        
+        async with self._user_lock(user_id):
+            self._player_cache.invalidate(user_id)
+            try:
+                new_xp, result = await self._executor.write(upsert)
+            finally:
+                self._player_cache.invalidate(user_id)
+            
+            leveled_up, old_level, new_level, _ = result
+            self._track_player(user_id, new_level if leveled_up else old_level, new_xp)
+            return result
     
     async def update_player(self, user_id, **kwargs):
         """Atualiza dados do jogador"""
-        async with self.lock:
-            if not kwargs:
-                return False
-            
-            conn = sqlite3.connect(self.db_path)
+        if not kwargs:
+            return False
+        
+        sql, columns = self.statements.update('players', kwargs, UPDATE_RETURNING['players'])
+        values = self.statements.params(columns, kwargs, user_id)
+        
+        def update(conn):
             cursor = conn.cursor()
             
-            set_clause = ", ".join([f"{key} = ?" for key in kwargs.keys()])
-            values = list(kwargs.values()) + [user_id]
-            
-            cursor.execute(f"UPDATE players SET {set_clause} WHERE user_id = ?", values)
+            cursor.execute(sql, values)
             
-            success = cursor.rowcount > 0
+            row = cursor.fetchone()
             conn.commit()
-            conn.close()
             
+            return row
+        
+        # Gravar o XP pendente antes, para não sobrescrever nem ser sobrescrito
+        await self.xp_buffer.forget(user_id)
+        
+        async with self._user_lock(user_id):
+            previous = self._player_cache.invalidate(user_id)
+            try:
+                row = await self._executor.write(update)
+            finally:
+                self._player_cache.invalidate(user_id)
+            
+            success = row is not None
+            if success:
+                self._track_player(user_id, *row)
+            
+            # Write-through: o registro em cache passa a refletir a escrita
+            if success and previous is not None:
+                previous.update(kwargs)
+                self._player_cache.write(user_id, previous)
             return success
     
-    def _calculate_level_from_xp(self, xp):
-        """Calcula o nível baseado no XP total"""
-        if xp < 100:
-            return 1
-        
-        level = 1
-        xp_needed = 100  # XP base para nível 2
-        total_xp_used = 0
+    async def apply_xp_deltas(self, rows):
+        """Aplica em lote deltas de XP: [(user_id, level, xp_delta, stat_points_delta)]"""
+        created_at = int(time.time())
+        params = [(user_id, level, xp_delta, stat_points_delta, created_at)
+                  for user_id, level, xp_delta, stat_points_delta in rows]
         
-        while total_xp_used + xp_needed <= xp:
-            total_xp_used += xp_needed
-            level += 1
-            xp_needed = int(xp_needed * 1.2)  # Aumenta 20%
+        def upsert(conn):
+            cursor = conn.cursor()
+            
+            cursor.executemany("""
+                INSERT INTO players (user_id, level, xp, stat_points, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (user_id) DO UPDATE SET
+                    xp = xp + excluded.xp,
+                    stat_points = stat_points + excluded.stat_points,
+                    level = MAX(level, excluded.level)
+            """, params)
+            
+            conn.commit()
         
-        return level
+        # Sem lock: a thread de escrita serializa os comandos e as versões
+        # do cache impedem que leituras concorrentes guardem dados antigos
+        for user_id, *_ in rows:
+            self._player_cache.invalidate(user_id)
+        try:
+            await self._executor.write(upsert)
+        finally:
+            for user_id, *_ in rows:
+                self._player_cache.invalidate(user_id)
     
-    def _xp_needed_for_level(self, target_level):
-        """Calcula XP total necessário para alcançar um nível"""
-        if target_level <= 1:
+    async def update_many(self, table, updates):
+        """Atualiza vários registros em uma transação: [(user_id, {coluna: valor}), ...]"""
+        if table not in UPDATE_RETURNING:
+            raise ValueError(f"Tabela desconhecida: {table}")
+        
+        # Valida tudo antes de escrever; chaves iguais reaproveitam o mesmo statement
+        batch = []
+        for user_id, changes in updates:
+            sql, columns = self.statements.update(table, changes, UPDATE_RETURNING[table])
+            batch.append((user_id, sql, self.statements.params(columns, changes, user_id)))
+        if not batch:
             return 0
         
-        total_xp = 0
-        xp_needed = 100  # XP base para nível 2
+        def update(conn):
+            cursor = conn.cursor()
+            
+            rows = []
+            for user_id, sql, values in batch:
+                cursor.execute(sql, values)
+                row = cursor.fetchone()
+                if row is not None:
+                    rows.append((user_id, row))
+            
+            conn.commit()
+            return rows
         
-        for level in range(2, target_level + 1):
-            total_xp += xp_needed
-            xp_needed = int(xp_needed * 1.2)
+        cache = self._character_cache if table == 'characters' else self._player_cache
+        user_ids = {user_id for user_id, _, _ in batch}
+        if table == 'players':
+            for user_id in user_ids:
+                await self.xp_buffer.forget(user_id)
         
-        return total_xp
+        # Listras em ordem crescente, para não haver deadlock entre lotes
+        stripes = sorted({hash(user_id) % len(self._user_locks) for user_id in user_ids})
+        async with AsyncExitStack() as stack:
+            for stripe in stripes:
+                await stack.enter_async_context(self._user_locks[stripe])
+            
+            for user_id in user_ids:
+                cache.invalidate(user_id)
+            try:
+                rows = await self._executor.write(update)
+            finally:
+                for user_id in user_ids:
+                    cache.invalidate(user_id)
+            
+            for user_id, row in rows:
+                if table == 'characters':
+                    self._track_character(row)
+                else:
+                    self._track_player(user_id, *row)
+            return len(rows)
+    
+    def _calculate_level_from_xp(self, xp):
+        """Calcula o nível baseado no XP total"""
+        return self.level_curve.level_for_xp(xp)
+    
+    def _xp_needed_for_level(self, target_level):
+        """Calcula XP total necessário para alcançar um nível"""
+        return self.level_curve.xp_for_level(target_level)
     
     def _xp_for_next_level(self, current_level):
         """Calcula XP necessário para o próximo nível"""
-        if current_level == 1:
-            return 100
+        return self.level_curve.xp_to_next_level(current_level)
+    
+    async def _load_xp_channels(self):
+        """Carrega os canais XP para o registro em memória"""
+        def query(conn):
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT channel_id, guild_id FROM xp_channels")
+            return cursor.fetchall()
         
-        xp_needed = 100
-        for i in range(2, current_level + 1):
-            xp_needed = int(xp_needed * 1.2)
+        rows = await self._executor.read(query)
         
-        return xp_needed
+        self._xp_channels.clear()
+        self._xp_channel_guilds.clear()
+        for channel_id, guild_id in rows:
+            self._register_xp_channel(channel_id, guild_id)
+    
+    def _register_xp_channel(self, channel_id, guild_id):
+        self._xp_channels.setdefault(guild_id, set()).add(channel_id)
+        self._xp_channel_guilds[channel_id] = guild_id
+    
+    def _unregister_xp_channel(self, channel_id):
+        guild_id = self._xp_channel_guilds.pop(channel_id, None)
+        channels = self._xp_channels.get(guild_id)
+        if channels is not None:
+            channels.discard(channel_id)
+            if not channels:
+                del self._xp_channels[guild_id]
     
     async def add_xp_channel(self, channel_id, guild_id):
         """Adiciona canal à lista de canais XP"""
-        async with self.lock:
-            conn = sqlite3.connect(self.db_path)
+        def insert(conn):
             cursor = conn.cursor()
             
             try:
                 cursor.execute("""
                     INSERT INTO xp_channels (channel_id, guild_id, added_at)
                     VALUES (?, ?, ?)
-                """, (channel_id, guild_id, datetime.now().isoformat()))
+                """, (channel_id, guild_id, int(time.time())))
                 
                 conn.commit()
                 return True
             except sqlite3.IntegrityError:
+                conn.rollback()
                 return False
-            finally:
-                conn.close()
+        
+        async with self._channel_lock:
+            success = await self._executor.write(insert)
+            if success:
+                self._register_xp_channel(channel_id, guild_id)
+            return success
     
     async def remove_xp_channel(self, channel_id):
         """Remove canal da lista de canais XP"""
-        async with self.lock:
-            conn = sqlite3.connect(self.db_path)
+        def delete(conn):
             cursor = conn.cursor()
             
             cursor.execute("DELETE FROM xp_channels WHERE channel_id = ?", (channel_id,))
             
             success = cursor.rowcount > 0
             conn.commit()
-            conn.close()
             
             return success
+        
+        async with self._channel_lock:
+            success = await self._executor.write(delete)
+            self._unregister_xp_channel(channel_id)
+            return success
     
     async def is_xp_channel(self, channel_id):
-        """Verifica se o canal está na lista de canais XP"""
-        async with self.lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT 1 FROM xp_channels WHERE channel_id = ?", (channel_id,))
-            result = cursor.fetchone()
-            conn.close()
-            
-            return result is not None
+        """Verifica se o canal está na lista de canais XP (sem I/O)"""
+        return channel_id in self._xp_channel_guilds
     
     async def get_xp_channels(self, guild_id):
-        """Obtém todos os canais XP de um servidor"""
-        async with self.lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT channel_id FROM xp_channels WHERE guild_id = ?", (guild_id,))
-            results = cursor.fetchall()
-            conn.close()
-            
-            return [row[0] for row in results]
\ No newline at end of file
+        """Obtém todos os canais XP de um servidor (sem I/O)"""
+        return sorted(self._xp_channels.get(guild_id, ()))
\ No newline at end of file
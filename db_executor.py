@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# Sinal enviado às threads para encerrarem
+_STOP = object()
+
+
+class LaneStats:
+    """Contadores de uma fila de execução (escrita ou leitura)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    def record(self, wait, run, ok):
+        with self.lock:
+            self.completed += 1
+            if not ok:
+                self.failed += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.total_run += run
+
+    def snapshot(self, depth):
+        with self.lock:
+            done = self.completed or 1
+            return {
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'queue_depth': depth,
+                'avg_wait_ms': self.total_wait / done * 1000,
+                'max_wait_ms': self.max_wait * 1000,
+                'avg_run_ms': self.total_run / done * 1000,
+            }
+
+
+class SQLiteExecutor:
+    """Executa o trabalho do SQLite fora do event loop.
+
+    Uma thread dedicada é dona da conexão de escrita e consome uma fila de
+    requisições; outras threads, cada uma com sua conexão somente leitura,
+    consomem a fila de leituras. As corrotinas aguardam o resultado sem
+    bloquear o loop.
+    """
+
+    def __init__(self, connect, read_workers=4):
+        self._connect = connect
+        self.read_workers = read_workers
+        self._write_queue = queue.Queue()
+        self._read_queue = queue.Queue()
+        self._threads = []
+        self._running = False
+        self.write_stats = LaneStats()
+        self.read_stats = LaneStats()
+
+    def start(self):
+        """Inicia a thread de escrita e as threads de leitura"""
+        writer = threading.Thread(
+            target=self._worker,
+            args=(self._write_queue, self.write_stats, False),
+            name="db-writer",
+            daemon=True
+        )
+        self._threads.append(writer)
+        for i in range(self.read_workers):
+            self._threads.append(threading.Thread(
+                target=self._worker,
+                args=(self._read_queue, self.read_stats, True),
+                name=f"db-reader-{i}",
+                daemon=True
+            ))
+        for thread in self._threads:
+            thread.start()
+        self._running = True
+
+    @property
+    def running(self):
+        """Se as threads foram iniciadas e ainda aceitam trabalho"""
+        return self._running
+
+    def _worker(self, jobs, stats, read_only):
+        """Loop de uma thread: abre sua conexão e processa a fila"""
+        conn = self._connect(read_only=read_only)
+        try:
+            while True:
+                job = jobs.get()
+                if job is _STOP:
+                    break
+                fn, args, future, enqueued_at = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                started = time.perf_counter()
+                ok = True
+                try:
+                    result = fn(conn, *args)
+                except BaseException as e:
+                    ok = False
+                    if conn.in_transaction:
+                        conn.rollback()
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+                stats.record(started - enqueued_at, time.perf_counter() - started, ok)
+        finally:
+            conn.close()
+
+    def _submit(self, jobs, stats, fn, args):
+        # Sem threads ninguém consome a fila: a corrotina esperaria para sempre
+        if not self._running:
+            raise RuntimeError("Executor do banco de dados não está em execução")
+        future = Future()
+        with stats.lock:
+            stats.submitted += 1
+        jobs.put((fn, args, future, time.perf_counter()))
+        return asyncio.wrap_future(future)
+
+    async def write(self, fn, *args):
+        """Executa fn(conn, *args) na thread de escrita"""
+        return await self._submit(self._write_queue, self.write_stats, fn, args)
+
+    async def read(self, fn, *args):
+        """Executa fn(conn, *args) em uma thread de leitura"""
+        return await self._submit(self._read_queue, self.read_stats, fn, args)
+
+    def stats(self):
+        """Retorna profundidade das filas e tempos de espera"""
+        return {
+            'write': self.write_stats.snapshot(self._write_queue.qsize()),
+            'read': self.read_stats.snapshot(self._read_queue.qsize()),
+        }
+
+    async def shutdown(self):
+        """Processa o que já está na fila e encerra as threads"""
+        self._running = False
+        self._write_queue.put(_STOP)
+        for _ in range(self.read_workers):
+            self._read_queue.put(_STOP)
+        for thread in self._threads:
+            await asyncio.to_thread(thread.join)
+        self._threads.clear()
+        logging.info("Executor do banco de dados encerrado")
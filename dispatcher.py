@@ -0,0 +1,172 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+# Prioridades (menor = enviado primeiro)
+INTERACTIVE = 0   # respostas a comandos
+NOTIFICATION = 1  # anúncios de level up
+
+
+class TokenBucket:
+    """Balde de tokens: `capacity` envios seguidos, repostos a `rate` por segundo"""
+
+    def __init__(self, capacity, rate):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        """Segundos até haver um token disponível (0 se já houver)"""
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill(time.monotonic())
+        self.tokens -= 1
+
+    def is_full(self):
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+
+class OutboundDispatcher:
+    """Fila de saída de mensagens por canal, respeitando o rate limit do Discord.
+
+    Cada canal tem seu balde de tokens (por padrão 5 mensagens a cada 5
+    segundos, como o limite do Discord) e uma fila de prioridade: respostas
+    a comandos passam na frente de anúncios de level up. Level ups do mesmo
+    canal dentro de `coalesce_window` segundos viram um único embed.
+    """
+
+    def __init__(self, level_up_renderer, burst=5, rate=1.0, coalesce_window=2.0):
+        self.level_up_renderer = level_up_renderer
+        self.burst = burst
+        self.rate = rate
+        self.coalesce_window = coalesce_window
+
+        self._buckets = {}      # channel_id -> TokenBucket
+        self._queues = {}       # channel_id -> heap [(prioridade, seq, destino, kwargs, future)]
+        self._senders = {}      # channel_id -> tarefa que esvazia a fila
+        self._level_ups = {}    # channel_id -> (canal, {user_id: [user, old, new, pontos]})
+        self._level_up_timers = {}
+        self._seq = itertools.count()
+
+        self.sent = 0
+        self.failed = 0
+        self.coalesced_level_ups = 0
+
+    @staticmethod
+    def _channel_id(destination):
+        # Aceita canais e Context (ctx.channel)
+        return getattr(destination, 'channel', destination).id
+
+    def _bucket(self, channel_id):
+        bucket = self._buckets.get(channel_id)
+        if bucket is None:
+            # Limpeza preguiçosa: baldes cheios não guardam informação útil
+            if len(self._buckets) > 1000:
+                for idle_id in [cid for cid, b in self._buckets.items()
+                                if b.is_full() and cid not in self._queues]:
+                    del self._buckets[idle_id]
+            bucket = self._buckets[channel_id] = TokenBucket(self.burst, self.rate)
+        return bucket
+
+    def send(self, destination, priority=INTERACTIVE, **kwargs):
+        """Agenda destination.send(**kwargs); o retorno pode ser aguardado para obter a mensagem"""
+        future = asyncio.get_running_loop().create_future()
+        channel_id = self._channel_id(destination)
+        heapq.heappush(
+            self._queues.setdefault(channel_id, []),
+            (priority, next(self._seq), destination, kwargs, future)
+        )
+        if channel_id not in self._senders:
+            self._senders[channel_id] = asyncio.create_task(self._drain(channel_id))
+        return future
+
+    async def _drain(self, channel_id):
+        queue = self._queues[channel_id]
+        bucket = self._bucket(channel_id)
+        try:
+            while queue:
+                wait = bucket.wait_time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+
+                # Pega o item mais prioritário só depois de ter o token
+                _, _, destination, kwargs, future = heapq.heappop(queue)
+                if future.cancelled():
+                    continue
+                bucket.take()
+                try:
+                    message = await destination.send(**kwargs)
+                except Exception as e:
+                    self.failed += 1
+                    logging.error(f"Erro ao enviar mensagem no canal {channel_id}: {e}")
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    self.sent += 1
+                    if not future.done():
+                        future.set_result(message)
+        finally:
+            del self._senders[channel_id]
+            if not queue:
+                del self._queues[channel_id]
+
+    def level_up(self, user, old_level, new_level, stat_points_gained, channel):
+        """Agenda um anúncio de level up, agrupando os do mesmo canal"""
+        entry = self._level_ups.get(channel.id)
+        if entry is None:
+            entry = self._level_ups[channel.id] = (channel, {})
+            self._level_up_timers[channel.id] = asyncio.get_running_loop().call_later(
+                self.coalesce_window, self._flush_level_ups, channel.id
+            )
+        else:
+            self.coalesced_level_ups += 1
+
+        _, users = entry
+        pending = users.get(user.id)
+        if pending is None:
+            users[user.id] = [user, old_level, new_level, stat_points_gained]
+        else:
+            pending[2] = new_level
+            pending[3] += stat_points_gained
+
+    def _flush_level_ups(self, channel_id):
+        self._level_up_timers.pop(channel_id, None)
+        channel, users = self._level_ups.pop(channel_id)
+        embed = self.level_up_renderer(list(users.values()))
+        future = self.send(channel, priority=NOTIFICATION, embed=embed)
+        # Falhas já são registradas em _drain; evita aviso de exceção não lida
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    async def stop(self, timeout=10.0):
+        """Envia os level ups agrupados e espera as filas esvaziarem (até `timeout`)"""
+        for channel_id, timer in list(self._level_up_timers.items()):
+            timer.cancel()
+            self._flush_level_ups(channel_id)
+
+        senders = list(self._senders.values())
+        if senders:
+            _, pending = await asyncio.wait(senders, timeout=timeout)
+            for task in pending:
+                task.cancel()
+
+    def stats(self):
+        return {
+            'channels_queued': len(self._queues),
+            'queued': sum(len(queue) for queue in self._queues.values()),
+            'sent': self.sent,
+            'failed': self.failed,
+            'coalesced_level_ups': self.coalesced_level_ups,
+        }
@@ -0,0 +1,111 @@
+from bisect import bisect_left, insort
+
+# Colunas usadas para ordenar cada ranking de personagens (desempate final: user_id)
+CHARACTER_CRITERIA = {
+    'level': ('level', 'experience'),
+    'wins': ('wins', 'experience'),
+    'experience': ('experience',),
+}
+
+# Colunas retornadas pelos rankings de personagens
+LEADERBOARD_COLUMNS = "user_id, name, faction, level, wins, losses, experience"
+
+# Linhas de ranking de personagens: (user_id, name, faction, level, wins, losses, experience)
+_CHARACTER_ROW_INDEX = {'level': 3, 'wins': 4, 'experience': 6}
+
+
+def character_key(criteria, row):
+    """Pontuação de uma linha de ranking de personagens para um critério"""
+    return tuple(row[_CHARACTER_ROW_INDEX[column]] for column in CHARACTER_CRITERIA[criteria])
+
+
+def _order_key(key, user_id):
+    # Chaves negadas: ordem crescente da lista = ranking decrescente
+    return tuple(-value for value in key) + (-user_id,)
+
+
+class TopN:
+    """Top N de um ranking, mantido incrementalmente em memória.
+
+    Guarda os `capacity` melhores registros em uma lista ordenada. Quando
+    não é possível saber quem entra no lugar de um registro que caiu ou
+    saiu do ranking, a estrutura fica marcada como `stale` e deve ser
+    recarregada do índice no banco.
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self._order = []    # [order_key] do melhor para o pior
+        self._members = {}  # user_id -> (order_key, row)
+        self._complete = False
+        self.stale = True
+        self.version = 0
+
+    def load(self, entries, version=None):
+        """Carrega [(key, user_id, row)] vindos do banco, do melhor para o pior.
+
+        Se `version` for informada e alguma atualização ocorreu desde então,
+        a carga é descartada (os dados lidos podem estar desatualizados).
+        """
+        if version is not None and version != self.version:
+            return False
+
+        self._order = []
+        self._members = {}
+        for key, user_id, row in entries[:self.capacity]:
+            order_key = _order_key(key, user_id)
+            self._order.append(order_key)
+            self._members[user_id] = (order_key, row)
+        self._order.sort()
+        self._complete = len(entries) < self.capacity
+        self.stale = False
+        return True
+
+    def update(self, user_id, key, row):
+        """Registra a nova pontuação de um usuário"""
+        self.version += 1
+        if self.stale:
+            return
+
+        order_key = _order_key(key, user_id)
+        current = self._members.get(user_id)
+        if current is not None:
+            if current[0] == order_key:
+                self._members[user_id] = (order_key, row)
+                return
+            worsened = order_key > current[0]
+            self._discard(user_id)
+            if worsened and not self._complete and (not self._order or order_key > self._order[-1]):
+                # Caiu para o fim do ranking: alguém de fora pode ter passado à frente
+                self.stale = True
+                return
+        elif len(self._order) >= self.capacity and order_key >= self._order[-1]:
+            # Fica de fora do top N: a lista deixa de conter todos os registros
+            self._complete = False
+            return
+
+        insort(self._order, order_key)
+        self._members[user_id] = (order_key, row)
+        if len(self._order) > self.capacity:
+            dropped = self._order.pop()
+            del self._members[-dropped[-1]]
+            self._complete = False
+
+    def remove(self, user_id):
+        """Remove um usuário do ranking (ex.: personagem inativo)"""
+        self.version += 1
+        if self.stale or user_id not in self._members:
+            return
+        self._discard(user_id)
+        if not self._complete:
+            self.stale = True
+
+    def _discard(self, user_id):
+        order_key, _ = self._members.pop(user_id)
+        del self._order[bisect_left(self._order, order_key)]
+
+    def top(self, limit):
+        """Retorna as `limit` primeiras linhas ou None se for preciso ir ao banco"""
+        if self.stale or (limit > len(self._order) and not self._complete):
+            return None
+        return [self._members[-order_key[-1]][1] for order_key in self._order[:limit]]
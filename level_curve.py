@@ -0,0 +1,89 @@
+from array import array
+from bisect import bisect_right
+
+# Maior limiar representável no array compacto ('q' = inteiro de 64 bits)
+_MAX_THRESHOLD = 2 ** 62
+
+
+class LevelCurve:
+    """Curva de níveis do sistema XP, pré-calculada.
+
+    O XP necessário para subir de nível começa em `base` e cresce 20% a
+    cada nível, truncado para inteiro (mesma regra de antes). Os limiares
+    acumulados ficam em um array compacto: xp -> nível é uma busca binária
+    e nível -> limiar é um acesso por índice.
+    """
+
+    def __init__(self, base=100, growth=1.2, initial_levels=200):
+        self.base = base
+        self.growth = growth
+
+        # _thresholds[i]: XP total para alcançar o nível i + 1
+        # _increments[i]: XP para ir do nível i + 1 ao nível i + 2
+        self._thresholds = array('q', [0])
+        self._increments = array('q', [base])
+        self._extend_to_level(initial_levels)
+
+    def _extend_once(self):
+        last_increment = self._increments[-1]
+        next_threshold = self._thresholds[-1] + last_increment
+        if next_threshold > _MAX_THRESHOLD:
+            return False
+        self._thresholds.append(next_threshold)
+        self._increments.append(int(last_increment * self.growth))
+        return True
+
+    def _extend_to_level(self, level):
+        while len(self._thresholds) < level and self._extend_once():
+            pass
+
+    def _extend_to_xp(self, xp):
+        while self._thresholds[-1] <= xp and self._extend_once():
+            pass
+
+    @property
+    def max_level(self):
+        """Maior nível já calculado na tabela"""
+        return len(self._thresholds)
+
+    def level_for_xp(self, xp):
+        """Nível correspondente a um XP total"""
+        if xp >= self._thresholds[-1]:
+            self._extend_to_xp(xp)
+        return max(1, bisect_right(self._thresholds, xp))
+
+    def xp_for_level(self, level):
+        """XP total necessário para alcançar um nível"""
+        if level <= 1:
+            return 0
+        self._extend_to_level(level)
+        return self._thresholds[level - 1]
+
+    def xp_to_next_level(self, level):
+        """XP necessário para sair de um nível e chegar ao próximo"""
+        if level <= 1:
+            return self.base
+        self._extend_to_level(level)
+        return self._increments[level - 1]
+
+    def levels_for_xp(self, xps):
+        """Converte vários XPs em níveis de uma vez (para recálculos em massa).
+
+        Ordena os valores e percorre a tabela uma única vez, em vez de uma
+        busca binária por valor. Retorna os níveis na ordem de entrada.
+        """
+        if not xps:
+            return []
+
+        self._extend_to_xp(max(xps))
+        thresholds = self._thresholds
+        count = len(thresholds)
+
+        levels = [0] * len(xps)
+        level = 1
+        for index in sorted(range(len(xps)), key=xps.__getitem__):
+            xp = xps[index]
+            while level < count and thresholds[level] <= xp:
+                level += 1
+            levels[index] = level
+        return levels
@@ -1,8 +1,16 @@
 import discord
 from discord.ext import commands
 import os
+import asyncio
+import json
 import logging
+from collections import defaultdict
 from database import Database
+from xp_pipeline import XPPipeline
+from dispatcher import OutboundDispatcher
+from xp_throttle import XPThrottle
+from record_cache import RecordCache
+from metrics import LatencyHistogram
 from commands import setup_commands
 
 # Configurar logging
@@ -28,14 +36,70 @@ class TokyoGhoulBot(commands.Bot):
             description='The System 🥀 - Bot de combate PvP temático de Tokyo Ghoul'
         )
         
-        self.db = Database()
+        # Janela máxima (em segundos) de XP não gravado em caso de queda
+        self.db = Database(xp_flush_interval=float(os.getenv('XP_FLUSH_INTERVAL', '5')))
+        
+        # Envio de mensagens com rate limit por canal e prioridades
+        self.dispatcher = OutboundDispatcher(self.create_level_up_embed)
+        
+        # Conteúdo já montado das abas do perfil, por (user_id, aba, versão dos dados)
+        self.profile_embeds = RecordCache(max_size=4096, ttl=600.0)
+        
+        # Latência até a confirmação de cada botão (prazo do Discord: 3s)
+        self.button_latency = defaultdict(LatencyHistogram)
+        
+        # Intervalo (em segundos) do registro periódico das métricas no log; 0 desativa
+        self.metrics_interval = float(os.getenv('METRICS_LOG_INTERVAL', '300'))
+        self._metrics_task = None
+        
+        # Limite de XP por usuário e filtro de texto repetido (em memória)
+        self.xp_throttle = XPThrottle()
+        
+        # Fila de XP entre on_message e as tarefas que processam o XP
+        self.xp_pipeline = XPPipeline(
+            self,
+            workers=int(os.getenv('XP_WORKERS', '4')),
+            max_queue=int(os.getenv('XP_QUEUE_SIZE', '1000')),
+            policy=os.getenv('XP_BACKPRESSURE', 'coalesce')
+        )
     
     async def setup_hook(self):
         """Configuração inicial do bot"""
         await self.db.initialize()
         await setup_commands(self)
+        self.xp_pipeline.start()
+        if self.metrics_interval > 0:
+            self._metrics_task = asyncio.create_task(self._log_metrics_loop())
         logging.info("Bot configurado com sucesso!")
     
+    def metrics_snapshot(self):
+        """Latência dos botões, pipeline de XP, executor e caches do banco"""
+        return {
+            'buttons': {button: histogram.snapshot() for button, histogram in sorted(self.button_latency.items())},
+            'xp_pipeline': self.xp_pipeline.stats(),
+            'executor': self.db.get_executor_stats(),
+            'caches': self.db.get_cache_stats(),
+            'dispatcher': self.dispatcher.stats(),
+        }
+    
+    async def _log_metrics_loop(self):
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+            try:
+                logging.info(f"Métricas: {json.dumps(self.metrics_snapshot())}")
+            except Exception as e:
+                logging.error(f"Erro ao registrar métricas: {e}")
+    
+    async def close(self):
+        """Encerra o bot e fecha as conexões do banco de dados"""
+        if self._metrics_task is not None:
+            self._metrics_task.cancel()
+            self._metrics_task = None
+        await self.xp_pipeline.stop()
+        await self.dispatcher.stop()
+        await super().close()
+        await self.db.close()
+    
     async def on_ready(self):
         """Evento chamado quando o bot está pronto"""
         logging.info(f'{self.user} conectou ao Discord!')
@@ -62,47 +126,67 @@ class TokyoGhoulBot(commands.Bot):
         if len(message.content.strip()) < 10:
             return
         
+        # Limitar a frequência de XP e ignorar texto repetido, sem tocar no banco
+        if not self.xp_throttle.allow(message.author.id, message.content):
+            return
+        
         # Gerar XP aleatório entre 0.5 e 3.0
         import random
         xp_gained = round(random.uniform(0.5, 3.0), 1)
         
-        # Adicionar XP ao jogador
-        leveled_up, old_level, new_level, stat_points_gained = await self.db.add_xp(message.author.id, xp_gained)
-        
-        # Se subiu de nível, enviar notificação
-        if leveled_up:
-            await self.send_level_up_notification(message.author, old_level, new_level, stat_points_gained, message.channel)
+        # Enfileirar o XP sem bloquear o gateway (processado pelas tarefas do pipeline)
+        self.xp_pipeline.submit(message.author, message.channel, xp_gained)
     
     async def send_level_up_notification(self, user, old_level, new_level, stat_points_gained, channel):
-        """Envia notificação de level up"""
+        """Envia notificação de level up (agrupada por canal pelo dispatcher)"""
+        self.dispatcher.level_up(user, old_level, new_level, stat_points_gained, channel)
+    
+    def create_level_up_embed(self, level_ups):
+        """Cria o embed de level up para [(user, old_level, new_level, stat_points_gained)]"""
+        if len(level_ups) == 1:
+            user, old_level, new_level, stat_points_gained = level_ups[0]
+            embed = discord.Embed(
+                title="🌟 LEVEL UP! 🌟",
+                description=f"**{user.display_name}** subiu para o nível **{new_level}**!",
+                color=0xffd700
+            )
+            
+            embed.add_field(
+                name="📈 Progressão",
+                value=f"Nível {old_level} → Nível {new_level}",
+                inline=True
+            )
+            
+            embed.add_field(
+                name="🎖️ Recompensas",
+                value=f"**+{stat_points_gained}** Pontos de Status",
+                inline=True
+            )
+            
+            embed.add_field(
+                name="💡 Dica",
+                value="Use seus pontos de status sabiamente para fortalecer seu personagem!",
+                inline=False
+            )
+            
+            embed.set_thumbnail(url=user.display_avatar.url)
+            embed.set_footer(text="Parabéns pelo seu progresso!")
+            
+            return embed
+        
+        # Vários level ups no mesmo canal em poucos segundos: um único embed
+        lines = [
+            f"**{user.display_name}**: Nível {old_level} → **{new_level}** (+{stat_points_gained} pontos)"
+            for user, old_level, new_level, stat_points_gained in level_ups
+        ]
         embed = discord.Embed(
             title="🌟 LEVEL UP! 🌟",
-            description=f"**{user.display_name}** subiu para o nível **{new_level}**!",
+            description="\n".join(lines),
             color=0xffd700
         )
-        
-        embed.add_field(
-            name="📈 Progressão",
-            value=f"Nível {old_level} → Nível {new_level}",
-            inline=True
-        )
-        
-        embed.add_field(
-            name="🎖️ Recompensas",
-            value=f"**+{stat_points_gained}** Pontos de Status",
-            inline=True
-        )
-        
-        embed.add_field(
-            name="💡 Dica",
-            value="Use seus pontos de status sabiamente para fortalecer seu personagem!",
-            inline=False
-        )
-        
-        embed.set_thumbnail(url=user.display_avatar.url)
         embed.set_footer(text="Parabéns pelo seu progresso!")
         
-        await channel.send(embed=embed)
+        return embed
     
     async def on_command_error(self, ctx, error):
         """Tratamento de erros de comandos"""
@@ -112,21 +196,21 @@ class TokyoGhoulBot(commands.Bot):
                 description="Use `!xp` para ver seu status ou peça ajuda a um administrador.",
                 color=0xff0000
             )
-            await ctx.send(embed=embed)
+            await self.dispatcher.send(ctx, embed=embed)
         elif isinstance(error, commands.MissingRequiredArgument):
             embed = discord.Embed(
                 title="❌ Argumentos insuficientes",
                 description=f"Comando incompleto. Verifique como usar o comando corretamente.",
                 color=0xff0000
             )
-            await ctx.send(embed=embed)
+            await self.dispatcher.send(ctx, embed=embed)
         elif isinstance(error, commands.CommandOnCooldown):
             embed = discord.Embed(
                 title="⏰ Comando em cooldown",
                 description=f"Aguarde {error.retry_after:.1f} segundos antes de usar este comando novamente.",
                 color=0xffaa00
             )
-            await ctx.send(embed=embed)
+            await self.dispatcher.send(ctx, embed=embed)
         elif isinstance(error, commands.MissingPermissions):
             embed = discord.Embed(
                 title="🚫 Sem Permissão",
@@ -134,7 +218,7 @@ class TokyoGhoulBot(commands.Bot):
                           "Apenas administradores podem configurar canais de XP.",
                 color=0xff4444
             )
-            await ctx.send(embed=embed)
+            await self.dispatcher.send(ctx, embed=embed)
         elif isinstance(error, commands.CheckFailure):
             embed = discord.Embed(
                 title="🚫 Acesso Negado",
@@ -142,7 +226,7 @@ class TokyoGhoulBot(commands.Bot):
                           "Este comando é restrito a administradores.",
                 color=0xff4444
             )
-            await ctx.send(embed=embed)
+            await self.dispatcher.send(ctx, embed=embed)
         else:
             logging.error(f"Erro não tratado: {error}")
             embed = discord.Embed(
@@ -150,7 +234,7 @@ class TokyoGhoulBot(commands.Bot):
                 description="Ocorreu um erro inesperado. Tente novamente em alguns momentos.",
                 color=0xff0000
             )
-            await ctx.send(embed=embed)
+            await self.dispatcher.send(ctx, embed=embed)
 
 def main():
     """Função principal para iniciar o bot"""
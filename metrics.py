@@ -0,0 +1,54 @@
+from bisect import bisect_left
+from collections import deque
+
+
+class LatencyStats:
+    """Estatísticas de latência: contagem, média, máximo e p95 recente"""
+
+    def __init__(self, window=1000):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent = deque(maxlen=window)
+
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self._recent.append(seconds)
+
+    def snapshot(self):
+        recent = sorted(self._recent)
+        p95 = recent[int(len(recent) * 0.95) - 1] if recent else 0.0
+        return {
+            'count': self.count,
+            'avg_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'p95_ms': p95 * 1000,
+            'max_ms': self.max * 1000,
+        }
+
+
+class LatencyHistogram(LatencyStats):
+    """Latência em baldes fixos (limites em segundos), além das estatísticas básicas.
+
+    Os limites padrão se concentram perto do prazo de 3 segundos que o
+    Discord dá para responder a uma interação.
+    """
+
+    BOUNDS = (0.1, 0.25, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0)
+
+    def __init__(self, bounds=BOUNDS, window=1000):
+        super().__init__(window)
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+
+    def record(self, seconds):
+        super().record(seconds)
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+
+    def snapshot(self):
+        labels = [f"<={bound * 1000:.0f}ms" for bound in self.bounds]
+        labels.append(f">{self.bounds[-1] * 1000:.0f}ms")
+        snapshot = super().snapshot()
+        snapshot['buckets'] = dict(zip(labels, self.counts))
+        return snapshot
@@ -0,0 +1,281 @@
+import logging
+import re
+from datetime import datetime
+
+from combat_partitions import PARTITION_VERSION
+from leaderboards import CHARACTER_CRITERIA, LEADERBOARD_COLUMNS
+
+# Linhas copiadas por transação ao reescrever uma tabela
+REWRITE_CHUNK = 5000
+
+# Conversão das colunas de data: TEXT ISO-8601 -> INTEGER (segundos epoch)
+EPOCH = ('INTEGER', "to_epoch({column})")
+
+
+def to_epoch(value):
+    """Converte um timestamp (epoch, ISO-8601 ou datetime) em segundos epoch inteiros"""
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value)
+    if isinstance(value, str):
+        # Colunas TEXT guardam epoch numérico como texto (ex.: cooldowns)
+        try:
+            return int(float(value))
+        except ValueError:
+            value = datetime.fromisoformat(value)
+    return int(value.timestamp())
+
+
+def rewrite_table(conn, table, retype, schema='main', chunk=REWRITE_CHUNK):
+    """Reescreve a tabela com novos tipos de coluna, copiando em blocos.
+
+    `retype` mapeia coluna -> (tipo novo, expressão de conversão). A cópia
+    vai para uma tabela temporária com um commit a cada `chunk` linhas
+    (INSERT ... SELECT, sem trazer linhas para o Python); a troca final e
+    a recriação dos índices acontecem numa única transação. Tabelas que já
+    têm os tipos novos não são tocadas, então a chamada pode ser repetida.
+    Retorna o número de linhas copiadas.
+    """
+    info = conn.execute(f"PRAGMA {schema}.table_info({table})").fetchall()
+    types = {row[1]: row[2].upper() for row in info}
+    if all(types.get(column) == new_type for column, (new_type, _) in retype.items()):
+        return 0
+
+    master = f"{schema}.sqlite_master"
+    table_sql, = conn.execute(
+        f"SELECT sql FROM {master} WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()
+    index_sqls = [row[0] for row in conn.execute(
+        f"SELECT sql FROM {master} WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,)
+    )]
+
+    # Mesmo CREATE TABLE, com outro nome e os tipos trocados
+    temp = f"{table}__rewrite"
+    body = table_sql[table_sql.index('('):]
+    for column, (new_type, _) in retype.items():
+        body = re.sub(rf'\b({column}\s+)\w+', rf'\g<1>{new_type}', body, count=1)
+
+    columns = [row[1] for row in info]
+    select = ", ".join(retype[column][1].format(column=column) if column in retype else column
+                       for column in columns)
+
+    # Uma cópia interrompida é descartada e refeita desde o início
+    conn.execute(f"DROP TABLE IF EXISTS {schema}.{temp}")
+    conn.execute(f"CREATE TABLE {schema}.{temp} {body}")
+
+    cursor = conn.cursor()
+    copied = 0
+    last = float('-inf')
+    while True:
+        cursor.execute(f"""
+            SELECT MAX(rowid) FROM (
+                SELECT rowid FROM {schema}.{table} WHERE rowid > ? ORDER BY rowid LIMIT ?
+            )
+        """, (last, chunk))
+        end = cursor.fetchone()[0]
+        if end is None:
+            break
+        cursor.execute(f"""
+            INSERT INTO {schema}.{temp} ({", ".join(columns)})
+            SELECT {select} FROM {schema}.{table} WHERE rowid > ? AND rowid <= ?
+        """, (last, end))
+        conn.commit()
+        copied += cursor.rowcount
+        last = end
+
+    conn.execute("BEGIN")
+    conn.execute(f"DROP TABLE {schema}.{table}")
+    conn.execute(f"ALTER TABLE {schema}.{temp} RENAME TO {table}")
+    for sql in index_sqls:
+        conn.execute(re.sub(r'^CREATE (UNIQUE )?INDEX ', rf'CREATE \g<1>INDEX {schema}.', sql))
+    conn.commit()
+
+    # A troca recria os índices numa transação só: devolve o WAL ao tamanho zero
+    conn.execute(f"PRAGMA {schema}.wal_checkpoint(TRUNCATE)")
+    return copied
+
+
+def _create_rank_indexes(conn):
+    """Índices de cobertura dos rankings (apenas personagens ativos)"""
+    for criteria, columns in CHARACTER_CRITERIA.items():
+        keys = columns + ('user_id',)
+        order = ", ".join(f"{column} DESC" for column in keys)
+        # Depois das chaves, só as colunas do ranking que ainda faltam
+        covered = [column.strip() for column in LEADERBOARD_COLUMNS.split(",")] + ['status']
+        extra = ", ".join(column for column in covered if column not in keys)
+        conn.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_characters_rank_{criteria}
+            ON characters ({order}, {extra})
+            WHERE status = 'ativo'
+        """)
+
+
+def _initial_schema(conn):
+    """Tabelas e índices de rankings (esquema anterior às migrações)"""
+    cursor = conn.cursor()
+
+    # Tabela de personagens
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS characters (
+            user_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            faction TEXT NOT NULL,
+            level INTEGER DEFAULT 1,
+            experience INTEGER DEFAULT 0,
+            strength INTEGER DEFAULT 10,
+            agility INTEGER DEFAULT 10,
+            resistance INTEGER DEFAULT 10,
+            health INTEGER DEFAULT 100,
+            max_health INTEGER DEFAULT 100,
+            stamina INTEGER DEFAULT 50,
+            max_stamina INTEGER DEFAULT 50,
+            kagune_quinque TEXT,
+            wins INTEGER DEFAULT 0,
+            losses INTEGER DEFAULT 0,
+            created_at TEXT NOT NULL,
+            last_combat TEXT,
+            status TEXT DEFAULT 'ativo',
+            ic_name TEXT DEFAULT '',
+            age TEXT DEFAULT '',
+            gender TEXT DEFAULT '',
+            appearance TEXT DEFAULT '',
+            backstory TEXT DEFAULT '',
+            perception INTEGER DEFAULT 10,
+            rc_control INTEGER DEFAULT 10,
+            regeneration INTEGER DEFAULT 10,
+            quinque_aptitude INTEGER DEFAULT 10,
+            intellect INTEGER DEFAULT 10
+        )
+    """)
+
+    # Tabela de combates (origem antiga, movida para as partições mensais)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS combat_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            attacker_id INTEGER NOT NULL,
+            defender_id INTEGER NOT NULL,
+            winner_id INTEGER,
+            combat_data TEXT,
+            experience_gained INTEGER,
+            timestamp TEXT NOT NULL,
+            FOREIGN KEY (attacker_id) REFERENCES characters (user_id),
+            FOREIGN KEY (defender_id) REFERENCES characters (user_id)
+        )
+    """)
+
+    # Sequências de IDs compartilhadas entre arquivos (ex.: partições de combates)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sequences (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("""
+        INSERT OR IGNORE INTO sequences (name, value)
+        VALUES ('combat_logs', (SELECT COALESCE(MAX(id), 0) FROM combat_logs))
+    """)
+
+    # Tabela de cooldowns
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cooldowns (
+            user_id INTEGER,
+            command_type TEXT,
+            expires_at TEXT,
+            PRIMARY KEY (user_id, command_type)
+        )
+    """)
+
+    # Tabela de jogadores (sistema XP)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS players (
+            user_id INTEGER PRIMARY KEY,
+            level INTEGER DEFAULT 1,
+            xp REAL DEFAULT 0.0,
+            stat_points INTEGER DEFAULT 0,
+            created_at TEXT NOT NULL
+        )
+    """)
+
+    # Tabela de canais XP
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS xp_channels (
+            channel_id INTEGER PRIMARY KEY,
+            guild_id INTEGER NOT NULL,
+            added_at TEXT NOT NULL
+        )
+    """)
+
+    _create_rank_indexes(conn)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_players_rank_xp
+        ON players (xp DESC, user_id DESC, level)
+    """)
+
+    conn.commit()
+
+
+def _epoch_timestamps(conn):
+    """Datas em segundos epoch (INTEGER) em vez de texto ISO-8601"""
+    rewrite_table(conn, 'characters', {'created_at': EPOCH, 'last_combat': EPOCH})
+    rewrite_table(conn, 'players', {'created_at': EPOCH})
+    rewrite_table(conn, 'cooldowns', {'expires_at': EPOCH})
+    rewrite_table(conn, 'xp_channels', {'added_at': EPOCH})
+
+
+def _expiry_index(conn):
+    """Índice de expiração dos cooldowns (limpeza e carga na inicialização)"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cooldowns_expires_at ON cooldowns (expires_at)")
+    conn.commit()
+
+
+def _rank_index_columns(conn):
+    """Índices dos rankings sem repetir as colunas de ordenação"""
+    for criteria in CHARACTER_CRITERIA:
+        conn.execute(f"DROP INDEX IF EXISTS idx_characters_rank_{criteria}")
+    _create_rank_indexes(conn)
+    conn.commit()
+
+
+# Migrações do banco principal: (versão, função). Cada função deve poder
+# ser repetida: se o processo parar no meio, ela roda de novo por inteiro.
+MIGRATIONS = (
+    (1, _initial_schema),
+    (2, _epoch_timestamps),
+    (3, _expiry_index),
+    (4, _rank_index_columns),
+)
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def migrate(conn):
+    """Aplica as migrações pendentes conforme PRAGMA user_version (thread de escrita)"""
+    conn.create_function('to_epoch', 1, to_epoch, deterministic=True)
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    applied = []
+    for target, migration in MIGRATIONS:
+        if target <= version:
+            continue
+        logging.info(f"Aplicando migração {target}: {migration.__doc__}")
+        migration(conn)
+        conn.execute(f"PRAGMA user_version = {target}")
+        conn.commit()
+        applied.append(target)
+    return applied
+
+
+def migrate_partitions(conn, partitions):
+    """Leva cada partição de combates à versão atual (PRAGMA user_version do arquivo)"""
+    conn.create_function('to_epoch', 1, to_epoch, deterministic=True)
+    migrated = []
+    for month in partitions.months():
+        alias = partitions.attach(conn, month)
+        if conn.execute(f"PRAGMA {alias}.user_version").fetchone()[0] >= PARTITION_VERSION:
+            continue
+        rewrite_table(conn, 'combat_logs', {'timestamp': EPOCH}, schema=alias)
+        conn.execute(f"PRAGMA {alias}.user_version = {PARTITION_VERSION}")
+        conn.commit()
+        migrated.append(month)
+    return migrated
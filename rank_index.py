@@ -0,0 +1,125 @@
+from bisect import bisect_left, bisect_right, insort
+
+
+class FenwickTree:
+    """Árvore de Fenwick (BIT) de contagens, cresce conforme necessário"""
+
+    def __init__(self, size=64):
+        self._tree = [0] * (size + 1)
+
+    @property
+    def size(self):
+        return len(self._tree) - 1
+
+    def _grow(self, index):
+        size = self.size
+        while size <= index:
+            size *= 2
+        counts = [self.prefix_sum(i) - self.prefix_sum(i - 1) for i in range(self.size)]
+        self.build(counts + [0] * (size - len(counts)))
+
+    def build(self, counts):
+        """Reconstrói a árvore a partir das contagens por posição em O(n)"""
+        tree = [0] + list(counts)
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def add(self, index, delta):
+        if index >= self.size:
+            self._grow(index)
+        i = index + 1
+        tree = self._tree
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def prefix_sum(self, index):
+        """Soma das posições 0..index"""
+        i = min(index + 1, self.size)
+        total = 0
+        tree = self._tree
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+
+class RankIndex:
+    """Posição exata de qualquer usuário em um ranking, em tempo logarítmico.
+
+    A pontuação é um balde inteiro (ex.: nível) mais um desempate dentro
+    do balde (ex.: XP). A árvore de Fenwick conta usuários por balde e
+    cada balde guarda seus desempates em uma lista ordenada; a posição é
+    1 + quantos usuários estão estritamente à frente.
+    """
+
+    def __init__(self):
+        self._fenwick = FenwickTree()
+        self._buckets = {}  # balde -> [desempates ordenados]
+        self._members = {}  # user_id -> (balde, desempate)
+
+    def __len__(self):
+        return len(self._members)
+
+    def load(self, entries):
+        """Carga inicial em lote a partir de [(user_id, balde, desempate)]"""
+        self._buckets = {}
+        self._members = {}
+        for user_id, bucket, tiebreak in entries:
+            bucket = max(0, int(bucket))
+            self._members[user_id] = (bucket, tiebreak)
+            self._buckets.setdefault(bucket, []).append(tiebreak)
+
+        counts = [0] * (max(self._buckets, default=0) + 1)
+        for bucket, values in self._buckets.items():
+            values.sort()
+            counts[bucket] = len(values)
+        self._fenwick = FenwickTree(max(64, len(counts)))
+        self._fenwick.build(counts + [0] * (self._fenwick.size - len(counts)))
+
+    def update(self, user_id, bucket, tiebreak):
+        bucket = max(0, int(bucket))
+        current = self._members.get(user_id)
+        if current == (bucket, tiebreak):
+            return
+        if current is not None:
+            self._discard(user_id, current)
+
+        self._members[user_id] = (bucket, tiebreak)
+        insort(self._buckets.setdefault(bucket, []), tiebreak)
+        self._fenwick.add(bucket, 1)
+
+    def remove(self, user_id):
+        current = self._members.get(user_id)
+        if current is not None:
+            self._discard(user_id, current)
+
+    def _discard(self, user_id, current):
+        bucket, tiebreak = current
+        values = self._buckets[bucket]
+        del values[bisect_right(values, tiebreak) - 1]
+        if not values:
+            del self._buckets[bucket]
+        self._fenwick.add(bucket, -1)
+        del self._members[user_id]
+
+    def rank(self, user_id):
+        """Retorna {'rank', 'total', 'percentile'} ou None se o usuário não está no ranking"""
+        current = self._members.get(user_id)
+        if current is None:
+            return None
+
+        bucket, tiebreak = current
+        total = len(self._members)
+        values = self._buckets[bucket]
+        ahead = (total - self._fenwick.prefix_sum(bucket)) + (len(values) - bisect_right(values, tiebreak))
+        behind = self._fenwick.prefix_sum(bucket - 1) + bisect_left(values, tiebreak)
+        return {
+            'rank': ahead + 1,
+            'total': total,
+            # Porcentagem dos demais usuários que ficam atrás deste
+            'percentile': behind / (total - 1) * 100 if total > 1 else 100.0,
+        }
@@ -0,0 +1,101 @@
+import time
+from collections import OrderedDict
+
+# Marca de ausência no cache (None é um valor válido: registro inexistente)
+MISSING = object()
+
+
+class RecordCache:
+    """Cache LRU de registros por user_id, com TTL e versão por chave.
+
+    Toda escrita incrementa a versão da chave. Uma leitura feita no banco
+    só é guardada se a versão não mudou desde que ela começou, então uma
+    leitura lenta que termina depois de uma escrita nunca recoloca dados
+    antigos no cache.
+    """
+
+    def __init__(self, max_size=2048, ttl=300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._versions = {}
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Retorna uma cópia do valor em cache ou MISSING"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return MISSING
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value.copy() if value is not None else None
+
+    def token(self, key):
+        """Versão atual da chave, a ser passada para put() após a leitura"""
+        return self._generation, self._versions.get(key, 0)
+
+    def put(self, key, value, token):
+        """Guarda o resultado de uma leitura se nenhuma escrita ocorreu"""
+        if token != self.token(key):
+            return False
+        self._store(key, value)
+        return True
+
+    def write(self, key, value):
+        """Write-through: guarda o valor recém-gravado no banco"""
+        self._bump(key)
+        self._store(key, value)
+
+    def invalidate(self, key):
+        """Descarta a chave e retorna o valor que estava em cache (ou None)"""
+        self._bump(key)
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self.invalidations += 1
+        return entry[0].copy() if entry[0] is not None else None
+
+    def clear(self):
+        self._entries.clear()
+        self._versions.clear()
+        self._generation += 1
+
+    def _bump(self, key):
+        self._versions[key] = self._versions.get(key, 0) + 1
+        # Limita a memória das versões: trocar a geração invalida os tokens antigos
+        if len(self._versions) > self.max_size * 4:
+            self._versions.clear()
+            self._generation += 1
+
+    def _store(self, key, value):
+        if value is not None:
+            value = value.copy()
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,97 @@
+from collections.abc import Mapping
+
+# Colunas na ordem usada nos SELECTs: a linha vira o registro sem consultar cursor.description
+CHARACTER_FIELDS = (
+    'user_id', 'name', 'faction', 'level', 'experience', 'strength', 'agility',
+    'resistance', 'health', 'max_health', 'stamina', 'max_stamina',
+    'kagune_quinque', 'wins', 'losses', 'created_at', 'last_combat', 'status',
+    'ic_name', 'age', 'gender', 'appearance', 'backstory', 'perception',
+    'rc_control', 'regeneration', 'quinque_aptitude', 'intellect',
+)
+
+PLAYER_FIELDS = ('user_id', 'level', 'xp', 'stat_points', 'created_at')
+
+
+def _slot_init(fields):
+    # __init__ gerado com uma atribuição por campo (como em namedtuple):
+    # bem mais rápido que setattr em laço para as 28 colunas de characters
+    assert all(field.isidentifier() for field in fields)
+    source = f"def __init__(self, {', '.join(fields)}):\n"
+    source += "".join(f"    self.{field} = {field}\n" for field in fields)
+    namespace = {}
+    exec(source, namespace)
+    return namespace['__init__']
+
+
+class Record(Mapping):
+    """Registro de uma linha do banco com __slots__ e interface de dicionário.
+
+    Subclasses definem FIELDS; registro['coluna'], .get(), .items(),
+    .update() e .copy() continuam funcionando como no dict de antes.
+    """
+
+    __slots__ = ()
+    FIELDS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.__init__ = _slot_init(cls.FIELDS)
+        cls._field_set = frozenset(cls.FIELDS)
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        """Row factory do sqlite3 para SELECTs com as colunas de FIELDS"""
+        return cls(*row)
+
+    def __getitem__(self, key):
+        if key not in self._field_set:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self._field_set:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        if key in self._field_set:
+            return getattr(self, key)
+        return default
+
+    def __contains__(self, key):
+        return key in self._field_set
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def update(self, values):
+        for key, value in values.items():
+            self[key] = value
+
+    def copy(self):
+        return type(self)(*[getattr(self, field) for field in self.FIELDS])
+
+    def __repr__(self):
+        values = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.FIELDS)
+        return f"{type(self).__name__}({values})"
+
+
+class Character(Record):
+    """Linha da tabela characters"""
+
+    __slots__ = CHARACTER_FIELDS
+    FIELDS = CHARACTER_FIELDS
+
+
+class Player(Record):
+    """Linha da tabela players"""
+
+    __slots__ = PLAYER_FIELDS
+    FIELDS = PLAYER_FIELDS
+
+
+CHARACTER_COLUMNS = ", ".join(CHARACTER_FIELDS)
+PLAYER_COLUMNS = ", ".join(PLAYER_FIELDS)
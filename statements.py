@@ -0,0 +1,53 @@
+class StatementRegistry:
+    """SQL dos UPDATEs dinâmicos, validado contra as colunas reais das tabelas.
+
+    As colunas vêm de PRAGMA table_info na inicialização. Chaves
+    desconhecidas geram ValueError antes de chegar ao SQL, e as colunas
+    são sempre ordenadas como na tabela: a mesma combinação de chaves gera
+    sempre o mesmo texto SQL, reaproveitado pelo cache de statements
+    preparados de cada conexão.
+    """
+
+    def __init__(self):
+        self._columns = {}     # tabela -> colunas atualizáveis, na ordem da tabela
+        self._statements = {}  # (tabela, chaves, returning) -> (sql, colunas)
+
+    def load(self, conn, tables):
+        """Lê as colunas de cada tabela (a chave primária não é atualizável)"""
+        for table in tables:
+            rows = conn.execute(f"PRAGMA table_info({table})").fetchall()
+            # (cid, name, type, notnull, dflt_value, pk)
+            self._columns[table] = tuple(row[1] for row in rows if not row[5])
+        self._statements.clear()
+
+    def columns(self, table):
+        return self._columns[table]
+
+    def update(self, table, keys, returning=None):
+        """Retorna (sql, colunas) do UPDATE ... WHERE user_id = ? para as chaves dadas"""
+        cache_key = (table, frozenset(keys), returning)
+        statement = self._statements.get(cache_key)
+        if statement is not None:
+            return statement
+
+        columns = self._columns.get(table)
+        if columns is None:
+            raise ValueError(f"Tabela desconhecida: {table}")
+        unknown = set(keys).difference(columns)
+        if unknown:
+            raise ValueError(f"Colunas inválidas para {table}: {', '.join(sorted(unknown))}")
+        if not keys:
+            raise ValueError("Nenhuma coluna para atualizar")
+
+        ordered = tuple(column for column in columns if column in keys)
+        sql = f"UPDATE {table} SET {', '.join(f'{column} = ?' for column in ordered)} WHERE user_id = ?"
+        if returning:
+            sql += f" RETURNING {returning}"
+
+        statement = self._statements[cache_key] = (sql, ordered)
+        return statement
+
+    @staticmethod
+    def params(columns, changes, user_id):
+        """Parâmetros na ordem canônica das colunas, seguidos do user_id"""
+        return [changes[column] for column in columns] + [user_id]
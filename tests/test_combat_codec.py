@@ -0,0 +1,92 @@
+import json
+import unittest
+
+import combat_codec
+
+
+def fight(turns=6):
+    return {
+        'attacker': {'name': 'Kaneki', 'faction': 'ghoul', 'level': 12},
+        'defender': {'name': 'Amon', 'faction': 'ccg', 'level': 11},
+        'turns': [
+            {'turn': turn + 1, 'actor': 'attacker' if turn % 2 == 0 else 'defender',
+             'action': 'kagune', 'damage': turn * 7, 'critical': turn == 3,
+             'attacker_hp': 100 - turn, 'defender_hp': 100 - 2 * turn}
+            for turn in range(turns)
+        ],
+        'result': 'vitória',
+        'duration': 12.5,
+    }
+
+
+class CombatCodecTest(unittest.TestCase):
+    def test_round_trip_values(self):
+        """Todos os tipos suportados voltam iguais"""
+        value = {'none': None, 'flags': [True, False], 'small': 127, 'big': 2 ** 40,
+                 'negative': -3, 'very_negative': -2 ** 40, 'float': -0.25,
+                 'text': 'Kagune ' * 10, 'unicode': 'ação', 'raw': b'\x00\xff',
+                 'nested': [[1, 'a'], {'b': []}]}
+        blob = combat_codec.encode(value)
+        self.assertFalse(blob[1] & combat_codec.FLAG_TURNS)
+        self.assertEqual(combat_codec.decode(blob), value)
+
+    def test_round_trip_turns(self):
+        """Turnos são gravados à parte e o combate volta igual"""
+        data = fight()
+        blob = combat_codec.encode(data, compress=False)
+        self.assertTrue(blob[1] & combat_codec.FLAG_TURNS)
+        self.assertEqual(combat_codec.decode(blob), data)
+
+    def test_repeated_strings_and_shapes_use_references(self):
+        """Chaves e strings repetidas viram referências"""
+        body = combat_codec.encode(fight(20), compress=False)[2:]
+        self.assertIn(combat_codec.SHAPE_REF, body)
+        self.assertIn(combat_codec.STR_REF, body)
+        self.assertEqual(body.count('attacker_hp'.encode()), 1)
+        self.assertEqual(body.count('kagune'.encode()), 1)
+
+    def test_compressed_body(self):
+        """Corpos grandes são comprimidos e decodificados normalmente"""
+        data = fight(5)
+        data['notes'] = ['Anteiku ' * 20 + str(index) for index in range(10)]
+        blob = combat_codec.encode(data)
+        self.assertTrue(blob[1] & combat_codec.FLAG_ZLIB)
+        self.assertLess(len(blob), len(combat_codec.encode(data, compress=False)))
+        self.assertEqual(combat_codec.decode(blob), data)
+        self.assertEqual(list(combat_codec.iter_turns(blob)), data['turns'])
+
+        small = combat_codec.encode({'turns': []})
+        self.assertFalse(small[1] & combat_codec.FLAG_ZLIB)
+
+    def test_iter_turns_is_lazy(self):
+        """iter_turns entrega os turnos um a um sem ler o resto do combate"""
+        data = fight()
+        blob = combat_codec.encode(data, compress=False)
+        turns = combat_codec.iter_turns(blob)
+        self.assertEqual(next(turns), data['turns'][0])
+        self.assertEqual(list(turns), data['turns'][1:])
+
+        # O restante do dicionário fica depois dos turnos: corrompê-lo não afeta iter_turns
+        truncated = blob[:-5]
+        self.assertEqual(list(combat_codec.iter_turns(truncated)), data['turns'])
+
+        self.assertEqual(list(combat_codec.iter_turns(combat_codec.encode({'winner': 1}))), [])
+        self.assertEqual(list(combat_codec.iter_turns(None)), [])
+
+    def test_legacy_json(self):
+        """Linhas antigas gravadas como texto JSON continuam legíveis"""
+        data = fight()
+        text = json.dumps(data)
+        self.assertEqual(combat_codec.decode(text), data)
+        self.assertEqual(list(combat_codec.iter_turns(text)), data['turns'])
+        self.assertIsNone(combat_codec.decode(None))
+
+    def test_unknown_version_rejected(self):
+        """Versão desconhecida do formato é rejeitada"""
+        blob = combat_codec.encode(fight())
+        with self.assertRaises(ValueError):
+            combat_codec.decode(bytes((99,)) + blob[1:])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from combat_partitions import CombatPartitions, attach_limit
+from database import Database
+
+
+class CombatPartitionsTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self._tmp.name, "test.db"), read_pool_size=1)
+        await self.db.initialize()
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        self._tmp.cleanup()
+
+    async def test_full_retention_stays_attached(self):
+        """Consultas em todos os meses retidos não desanexam partições"""
+        now = datetime.now()
+        months = self.db.combat_partitions.retention_months
+        rows = []
+        for offset in range(months):
+            index = now.year * 12 + now.month - 1 - offset
+            moment = datetime(index // 12, index % 12 + 1, 1, 12)
+            rows.append((1, 2, 1, b'', 5, int(moment.timestamp())))
+        await self.db.insert_combat_logs(rows)
+        self.assertEqual(len(self.db.combat_partitions.months()), months)
+
+        for _ in range(3):
+            stats = await self.db.get_combat_stats(1)
+            self.assertEqual(stats['total'], months)
+
+        for attached in self.db.combat_partitions._attached.values():
+            self.assertEqual(len(attached), months)
+
+    async def test_failed_batch_writes_nothing(self):
+        """Falha num mês desfaz os outros: o lote recolocado não duplica combates"""
+        now = datetime.now()
+        index = now.year * 12 + now.month - 2
+        previous = datetime(index // 12, index % 12 + 1, 1, 12)
+        self.db.combat_logs.add((1, 2, 1, b'', 5, int(previous.timestamp())))
+        # attacker_id NULL viola NOT NULL no segundo mês
+        self.db.combat_logs.add((None, 2, 1, b'', 5, int(now.timestamp())))
+
+        with self.assertRaises(Exception):
+            await self.db.combat_logs.flush()
+
+        self.assertEqual(len(self.db.combat_logs), 2)
+        # Descarta o lote inválido para que as consultas (que fazem flush) rodem
+        self.db.combat_logs._pending.clear()
+        self.assertEqual((await self.db.get_combat_stats(1))['total'], 0)
+        sequence = await self.db._executor.read(
+            lambda conn: conn.execute("SELECT value FROM sequences WHERE name = 'combat_logs'").fetchone()[0]
+        )
+        self.assertEqual(sequence, 0)
+
+    def test_rejects_retention_over_attach_limit(self):
+        """Retenção que não cabe no limite de ATTACH do SQLite é rejeitada"""
+        with self.assertRaises(ValueError):
+            CombatPartitions(self._tmp.name, retention_months=attach_limit())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+
+from database import Database
+
+
+class ExecutorLifecycleTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self._tmp.name, "test.db"))
+
+    async def asyncTearDown(self):
+        self._tmp.cleanup()
+
+    async def test_close_without_initialize(self):
+        """Fechar sem initialize() (login falhou) não fica esperando o executor"""
+        await asyncio.wait_for(self.db.close(), 1)
+
+    async def test_requests_fail_when_not_running(self):
+        """Sem threads, leituras e escritas falham em vez de esperar para sempre"""
+        with self.assertRaises(RuntimeError):
+            await asyncio.wait_for(self.db.get_character(1), 1)
+
+        await self.db.initialize()
+        await self.db.close()
+
+        with self.assertRaises(RuntimeError):
+            await asyncio.wait_for(self.db.get_player(1), 1)
+
+    async def test_close_survives_failed_flush(self):
+        """Falha ao gravar o XP no encerramento não perde combates e cooldowns"""
+        await self.db.initialize()
+        await self.db.create_player(1)
+        await self.db.xp_buffer.add(1, 50)
+        self.db.combat_logs.add((1, 2, 1, b'', 5, int(time.time())))
+        await self.db.set_cooldown(1, 'treino', 10)
+
+        async def fail(rows):
+            raise RuntimeError("disco cheio")
+        self.db.apply_xp_deltas = fail
+
+        with self.assertLogs(level='ERROR'):
+            await self.db.close()
+        self.assertFalse(self.db._executor.running)
+
+        db = Database(self.db.db_path)
+        await db.initialize()
+        try:
+            self.assertEqual((await db.get_combat_stats(1))['total'], 1)
+            self.assertTrue((await db.check_cooldown(1, 'treino'))[0])
+        finally:
+            await db.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
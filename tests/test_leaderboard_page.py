@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+
+from database import Database
+
+
+class LeaderboardPageTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self._tmp.name, "test.db"))
+        await self.db.initialize()
+        for user_id in range(1, 26):
+            await self.db.create_character(user_id, f"user{user_id}", 'ghoul', 'Rinkaku')
+            await self.db.update_character(user_id, level=user_id % 7, experience=user_id * 10)
+            await self.db.add_xp(user_id, user_id % 5 + 1)
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        self._tmp.cleanup()
+
+    def reads(self):
+        return self.db.get_executor_stats()['read']['submitted']
+
+    async def test_first_page_from_memory(self):
+        """Primeira página sem tocar no banco, igual à do índice"""
+        for criteria in ('level', 'wins', 'experience', 'xp'):
+            before = self.reads()
+            rows, after = await self.db.get_leaderboard_page(criteria, None, 10)
+            self.assertEqual(self.reads(), before)
+
+            board = self.db._xp_leaderboard if criteria == 'xp' else self.db._leaderboards[criteria]
+            board.stale = True
+            from_disk, disk_after = await self.db.get_leaderboard_page(criteria, None, 10)
+            self.assertEqual([tuple(row) for row in rows], [tuple(row) for row in from_disk])
+            self.assertEqual(after, disk_after)
+
+    async def test_pages_cover_everyone_once(self):
+        """Primeira página da memória e as seguintes por keyset, sem repetir ninguém"""
+        for criteria in ('level', 'xp'):
+            seen = []
+            after = None
+            while True:
+                rows, after = await self.db.get_leaderboard_page(criteria, after, 10)
+                seen.extend(row[0] for row in rows)
+                if after is None:
+                    break
+            self.assertEqual(sorted(seen), list(range(1, 26)))
+
+    async def test_pages_with_buffered_xp(self):
+        """XP ainda no acumulador não repete nem pula ninguém entre as páginas"""
+        await self.db.xp_buffer.add(5, 500)
+        self.assertIn(5, self.db.xp_buffer._pending)
+
+        seen = []
+        after = None
+        while True:
+            rows, after = await self.db.get_leaderboard_page('xp', after, 5)
+            seen.extend(row[0] for row in rows)
+            if after is None:
+                break
+        self.assertEqual(seen[0], 5)
+        self.assertEqual(sorted(seen), list(range(1, 26)))
+
+    async def test_stale_first_page_reloads_board(self):
+        """Primeira página com o top N desatualizado recarrega o top N uma vez"""
+        for criteria in ('level', 'xp'):
+            board = self.db._xp_leaderboard if criteria == 'xp' else self.db._leaderboards[criteria]
+            board.stale = True
+            before = self.reads()
+            for _ in range(3):
+                await self.db.get_leaderboard_page(criteria, None, 10)
+            self.assertEqual(self.reads(), before + 1)
+            self.assertFalse(board.stale)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,19 @@
+import unittest
+
+from bench.stress_locks import run_stress
+
+
+class LockStripingTest(unittest.IsolatedAsyncioTestCase):
+    async def test_no_lost_updates(self):
+        """add_experience concorrente não perde atualizações com locks listrados"""
+        stats = await run_stress(lock_stripes=64, users=20, calls=10, admin_ops=10)
+        self.assertEqual(stats['lost_updates'], 0)
+
+    async def test_single_stripe_no_lost_updates(self):
+        """Com uma única listra (lock global) o resultado é o mesmo"""
+        stats = await run_stress(lock_stripes=1, users=5, calls=10, admin_ops=5)
+        self.assertEqual(stats['lost_updates'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
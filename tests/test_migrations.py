@@ -0,0 +1,88 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from database import Database
+from leaderboards import CHARACTER_CRITERIA, LEADERBOARD_COLUMNS
+from migrations import SCHEMA_VERSION
+
+
+class RankIndexTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "test.db")
+
+    async def asyncTearDown(self):
+        self._tmp.cleanup()
+
+    async def open(self):
+        db = Database(self.path)
+        await db.initialize()
+        await db.close()
+
+    def index_columns(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            return {
+                criteria: [row[2] for row in conn.execute(
+                    f"PRAGMA index_info(idx_characters_rank_{criteria})"
+                )]
+                for criteria in CHARACTER_CRITERIA
+            }
+        finally:
+            conn.close()
+
+    def assert_rank_indexes(self):
+        for criteria, columns in self.index_columns().items():
+            self.assertEqual(len(columns), len(set(columns)), columns)
+            self.assertEqual(columns[:len(CHARACTER_CRITERIA[criteria]) + 1],
+                             list(CHARACTER_CRITERIA[criteria]) + ['user_id'])
+
+    async def test_new_database(self):
+        """Índices dos rankings não repetem as colunas de ordenação e cobrem a consulta"""
+        await self.open()
+        self.assert_rank_indexes()
+
+        conn = sqlite3.connect(self.path)
+        try:
+            plan = " ".join(row[3] for row in conn.execute(f"""
+                EXPLAIN QUERY PLAN
+                SELECT {LEADERBOARD_COLUMNS} FROM characters
+                WHERE status = 'ativo'
+                ORDER BY level DESC, experience DESC, user_id DESC
+                LIMIT 10
+            """))
+        finally:
+            conn.close()
+        self.assertIn("COVERING INDEX idx_characters_rank_level", plan)
+
+    async def test_migrates_duplicated_columns(self):
+        """Bancos na versão 3 têm os índices antigos recriados"""
+        await self.open()
+        conn = sqlite3.connect(self.path)
+        try:
+            for criteria, columns in CHARACTER_CRITERIA.items():
+                order = ", ".join(f"{column} DESC" for column in columns)
+                conn.execute(f"DROP INDEX idx_characters_rank_{criteria}")
+                conn.execute(f"""
+                    CREATE INDEX idx_characters_rank_{criteria}
+                    ON characters ({order}, user_id DESC, {LEADERBOARD_COLUMNS}, status)
+                    WHERE status = 'ativo'
+                """)
+            conn.execute("PRAGMA user_version = 3")
+            conn.commit()
+        finally:
+            conn.close()
+
+        await self.open()
+        self.assert_rank_indexes()
+        conn = sqlite3.connect(self.path)
+        try:
+            self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], SCHEMA_VERSION)
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+from database import Database
+from records import Character, Player
+
+
+class ProfileSnapshotTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self._tmp.name, "test.db"))
+        await self.db.initialize()
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        self._tmp.cleanup()
+
+    async def test_player_cache_miss_with_cached_character(self):
+        """Personagem em cache e jogador invalidado (flush de XP): o jogador vem do banco"""
+        await self.db.create_character(1, "Kaneki", "ghoul", "Rinkaku")
+        await self.db.update_character(1, strength=20)
+        await self.db.get_character(1)
+        await self.db.xp_buffer.add(1, 5)
+        await self.db.xp_buffer.flush()
+
+        character, player = await self.db.get_profile_snapshot(1)
+
+        self.assertIsInstance(character, Character)
+        self.assertEqual(character['strength'], 20)
+        self.assertIsInstance(player, Player)
+        self.assertEqual(player['xp'], 5)
+
+    async def test_buffered_xp_overlays_player(self):
+        """XP ainda no acumulador aparece no jogador retornado"""
+        await self.db.create_character(2, "Touka", "ghoul", "Ukaku")
+        await self.db.get_character(2)
+        await self.db.xp_buffer.add(2, 7)
+
+        _, player = await self.db.get_profile_snapshot(2)
+
+        self.assertEqual(player['xp'], 7)
+
+    async def test_creates_missing_player(self):
+        """Sem jogador no banco, o snapshot cria o registro"""
+        character, player = await self.db.get_profile_snapshot(3)
+
+        self.assertIsNone(character)
+        self.assertIsInstance(player, Player)
+        self.assertEqual(player['level'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import asyncio
+import unittest
+
+from write_behind import WriteBehindLoop
+
+
+class WriteBehindLoopTest(unittest.IsolatedAsyncioTestCase):
+    async def test_periodic_and_triggered_flush(self):
+        """Grava a cada intervalo e também quando acionado"""
+        calls = []
+
+        async def flush():
+            calls.append(1)
+
+        writer = WriteBehindLoop(flush, 0.01, "Erro")
+        writer.start()
+        await asyncio.sleep(0.05)
+        self.assertGreater(len(calls), 0)
+
+        writer.interval = 60
+        await writer.stop()
+        before = len(calls)
+        writer.trigger()
+        writer.trigger()  # agrupa com a gravação já agendada
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        self.assertEqual(len(calls), before + 1)
+
+    async def test_stop_waits_for_inflight_flush(self):
+        """stop não cancela uma gravação em andamento"""
+        started = asyncio.Event()
+        finished = []
+
+        async def flush():
+            started.set()
+            await asyncio.sleep(0.05)
+            finished.append(1)
+
+        writer = WriteBehindLoop(flush, 60, "Erro")
+        writer.start()
+        writer.trigger()
+        await started.wait()
+        await writer.stop()
+        # gravação acionada + gravação final, ambas completas
+        self.assertEqual(len(finished), 2)
+
+    async def test_background_errors_logged_final_flush_raises(self):
+        """Erros em segundo plano vão para o log; a gravação final os propaga"""
+        async def flush():
+            raise RuntimeError("disco cheio")
+
+        writer = WriteBehindLoop(flush, 0.01, "Erro ao gravar teste")
+        with self.assertLogs(level='ERROR') as logs:
+            writer.start()
+            await asyncio.sleep(0.03)
+        self.assertIn("Erro ao gravar teste: disco cheio", logs.output[0])
+
+        with self.assertRaises(RuntimeError):
+            await writer.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
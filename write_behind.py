@@ -0,0 +1,64 @@
+import asyncio
+import logging
+
+
+class WriteBehindLoop:
+    """Agenda as gravações de um buffer write-behind.
+
+    Chama `flush` a cada `interval` segundos e, sob demanda, quando o
+    buffer atinge seu limite (`trigger`). Erros das gravações em segundo
+    plano são registrados no log; manter as pendências para a próxima
+    tentativa é responsabilidade do buffer. `stop` espera a gravação em
+    andamento terminar (nunca a cancela no meio) e faz uma última
+    gravação, propagando erros.
+    """
+
+    def __init__(self, flush, interval, error_message):
+        self._flush = flush
+        self.interval = interval
+        self.error_message = error_message
+
+        self._stopping = asyncio.Event()
+        self._task = None
+        self._trigger_task = None
+
+    def start(self):
+        """Inicia as gravações periódicas"""
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Para as gravações periódicas e grava o que estiver pendente"""
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        if self._trigger_task is not None:
+            await self._trigger_task
+        await self._flush()
+
+    def trigger(self):
+        """Agenda uma gravação imediata (ex.: limite de pendências atingido)"""
+        if self._trigger_task is None:
+            self._trigger_task = asyncio.create_task(self._triggered())
+
+    async def _loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.interval)
+                return
+            except asyncio.TimeoutError:
+                await self._flush_logged()
+
+    async def _triggered(self):
+        try:
+            await self._flush_logged()
+        finally:
+            self._trigger_task = None
+
+    async def _flush_logged(self):
+        try:
+            await self._flush()
+        except Exception as e:
+            logging.error(f"{self.error_message}: {e}")
@@ -0,0 +1,129 @@
+import asyncio
+
+from write_behind import WriteBehindLoop
+
+
+class XPAccumulator:
+    """Acumulador write-behind de XP.
+
+    Guarda em memória o estado de cada jogador que recebeu XP, detecta
+    level ups na hora a partir desse estado e grava os deltas acumulados
+    na tabela players em lote (um único executemany), por tempo ou por
+    quantidade de jogadores pendentes. Em caso de queda, no máximo
+    `flush_interval` segundos de XP são perdidos.
+    """
+
+    def __init__(self, db, flush_interval=5.0, flush_threshold=500):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+
+        # user_id -> [level, xp, stat_points] (estado já somado aos deltas)
+        self._state = {}
+        # user_id -> [xp_delta, stat_points_delta, level]
+        self._pending = {}
+        self._flush_lock = asyncio.Lock()
+        self._writer = WriteBehindLoop(self.flush, flush_interval, "Erro ao gravar XP acumulado")
+
+    def start(self):
+        """Inicia o flush periódico"""
+        self._writer.start()
+
+    async def stop(self):
+        """Para o flush periódico e grava o que estiver pendente"""
+        await self._writer.stop()
+
+    async def _load_state(self, user_id):
+        state = self._state.get(user_id)
+        if state is not None:
+            return state
+
+        player = await self.db.get_player(user_id)
+        # Outra mensagem do mesmo usuário pode ter carregado o estado antes
+        state = self._state.get(user_id)
+        if state is not None:
+            return state
+
+        if player:
+            state = [player['level'], player['xp'], player['stat_points']]
+        else:
+            state = [1, 0.0, 0]
+        self._state[user_id] = state
+        return state
+
+    async def add(self, user_id, xp_amount):
+        """Acumula XP e retorna (leveled_up, old_level, new_level, stat_points_gained)"""
+        state = await self._load_state(user_id)
+
+        old_level = state[0]
+        new_xp = state[1] + xp_amount
+        new_level = self.db._calculate_level_from_xp(new_xp)
+
+        stat_points_gained = 0
+        if new_level > old_level:
+            stat_points_gained = (new_level - old_level) * 3  # 3 pontos por nível
+        else:
+            new_level = old_level
+
+        state[0] = new_level
+        state[1] = new_xp
+        state[2] += stat_points_gained
+        self.db._track_player(user_id, new_level, new_xp)
+
+        pending = self._pending.get(user_id)
+        if pending is None:
+            self._pending[user_id] = [xp_amount, stat_points_gained, new_level]
+        else:
+            pending[0] += xp_amount
+            pending[1] += stat_points_gained
+            pending[2] = new_level
+
+        if len(self._pending) >= self.flush_threshold:
+            self._writer.trigger()
+
+        return new_level > old_level, old_level, new_level, stat_points_gained
+
+    def peek(self, user_id):
+        """Retorna o estado em memória (level, xp, stat_points) ou None"""
+        state = self._state.get(user_id)
+        return tuple(state) if state is not None else None
+
+    async def forget(self, user_id):
+        """Grava pendências e descarta o estado em memória de um jogador"""
+        while user_id in self._pending:
+            await self.flush()
+        self._state.pop(user_id, None)
+
+    async def flush(self):
+        """Grava todos os deltas pendentes em uma única transação"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            batch, self._pending = self._pending, {}
+            rows = [
+                (user_id, level, xp_delta, stat_points_delta)
+                for user_id, (xp_delta, stat_points_delta, level) in batch.items()
+            ]
+
+            try:
+                await self.db.apply_xp_deltas(rows)
+            except Exception:
+                # Devolver os deltas para a próxima tentativa
+                for user_id, (xp_delta, stat_points_delta, level) in batch.items():
+                    pending = self._pending.get(user_id)
+                    if pending is None:
+                        self._pending[user_id] = [xp_delta, stat_points_delta, level]
+                    else:
+                        pending[0] += xp_delta
+                        pending[1] += stat_points_delta
+                        pending[2] = max(pending[2], level)
+                raise
+
+            # Mantém a memória limitada: descarta o estado de quem foi gravado
+            if len(self._state) > self.flush_threshold * 4:
+                for user_id in batch:
+                    if user_id not in self._pending:
+                        self._state.pop(user_id, None)
+
+            return len(rows)
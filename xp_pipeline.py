@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import time
+
+from metrics import LatencyStats
+
+# Políticas quando a fila está cheia
+DROP = 'drop'          # descarta o evento novo
+COALESCE = 'coalesce'  # soma o XP a um evento pendente do mesmo usuário; se não houver, descarta
+
+
+class XPEvent:
+    """XP ganho por uma mensagem, aguardando processamento"""
+
+    __slots__ = ('user', 'channel', 'xp', 'enqueued_at')
+
+    def __init__(self, user, channel, xp):
+        self.user = user
+        self.channel = channel
+        self.xp = xp
+        self.enqueued_at = time.perf_counter()
+
+
+class XPPipeline:
+    """Fila limitada entre on_message e o processamento de XP.
+
+    on_message só enfileira (sem await); um grupo de tarefas consumidoras
+    acumula o XP e envia as notificações de level up. Com a fila cheia o
+    evento é descartado ou, na política COALESCE, somado a um evento ainda
+    pendente do mesmo usuário — o gateway nunca espera.
+    """
+
+    def __init__(self, bot, workers=4, max_queue=1000, policy=COALESCE):
+        if policy not in (DROP, COALESCE):
+            raise ValueError(f"Política de fila inválida: {policy}")
+        self.bot = bot
+        self.workers = workers
+        self.policy = policy
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._pending = {}  # user_id -> XPEvent ainda na fila
+        self._tasks = []
+
+        self.enqueued = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.failed = 0
+        self.latency = LatencyStats()
+
+    def start(self):
+        """Inicia as tarefas consumidoras"""
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(), name=f"xp-worker-{i}"))
+
+    async def stop(self, timeout=10.0):
+        """Processa o que restou na fila (até `timeout`) e encerra as tarefas"""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"{self._queue.qsize()} eventos de XP descartados ao encerrar")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def submit(self, user, channel, xp):
+        """Enfileira XP sem bloquear; retorna False se o evento foi descartado"""
+        if self.policy == COALESCE:
+            pending = self._pending.get(user.id)
+            if pending is not None:
+                pending.xp = round(pending.xp + xp, 1)
+                pending.channel = channel
+                self.coalesced += 1
+                return True
+
+        event = XPEvent(user, channel, xp)
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+        self.enqueued += 1
+        if self.policy == COALESCE:
+            self._pending[user.id] = event
+        return True
+
+    async def _worker(self):
+        while True:
+            event = await self._queue.get()
+            # A partir daqui o evento não aceita mais XP coalescido
+            if self._pending.get(event.user.id) is event:
+                del self._pending[event.user.id]
+            try:
+                await self._process(event)
+            except Exception as e:
+                self.failed += 1
+                logging.error(f"Erro ao processar XP: {e}")
+            finally:
+                self.latency.record(time.perf_counter() - event.enqueued_at)
+                self._queue.task_done()
+
+    async def _process(self, event):
+        leveled_up, old_level, new_level, stat_points_gained = await self.bot.db.xp_buffer.add(event.user.id, event.xp)
+
+        # Se subiu de nível, enviar notificação
+        if leveled_up:
+            await self.bot.send_level_up_notification(event.user, old_level, new_level, stat_points_gained, event.channel)
+
+    def stats(self):
+        """Profundidade da fila, descartes e latência de ponta a ponta"""
+        return {
+            'queue_depth': self._queue.qsize(),
+            'max_queue': self._queue.maxsize,
+            'enqueued': self.enqueued,
+            'coalesced': self.coalesced,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'latency': self.latency.snapshot(),
+        }
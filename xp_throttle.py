@@ -0,0 +1,64 @@
+import hashlib
+from collections import OrderedDict, deque
+
+from dispatcher import TokenBucket
+
+
+def _digest(content):
+    # Normaliza maiúsculas e espaços para que pequenas variações contem como repetição
+    normalized = " ".join(content.casefold().split())
+    return hashlib.blake2b(normalized.encode(), digest_size=8).digest()
+
+
+class XPThrottle:
+    """Limite de XP por usuário e filtro de mensagens repetidas, só em memória.
+
+    Cada usuário tem um balde de tokens (`burst` mensagens que rendem XP,
+    repostas a uma a cada `refill_seconds`) e guarda o digest das últimas
+    `recent_messages` mensagens: texto repetido não rende XP. No máximo
+    `max_users` usuários ficam em memória (os menos recentes saem primeiro).
+    """
+
+    def __init__(self, burst=3, refill_seconds=20.0, recent_messages=8, max_users=50000):
+        self.burst = burst
+        self.rate = 1 / refill_seconds
+        self.recent_messages = recent_messages
+        self.max_users = max_users
+        self._users = OrderedDict()  # user_id -> (TokenBucket, deque de digests)
+
+        self.allowed = 0
+        self.throttled = 0
+        self.duplicates = 0
+
+    def allow(self, user_id, content):
+        """Retorna True se a mensagem deve render XP"""
+        state = self._users.get(user_id)
+        if state is None:
+            state = (TokenBucket(self.burst, self.rate), deque(maxlen=self.recent_messages))
+            self._users[user_id] = state
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+
+        bucket, recent = state
+        digest = _digest(content)
+        if digest in recent:
+            self.duplicates += 1
+            return False
+        recent.append(digest)
+
+        if bucket.wait_time() > 0:
+            self.throttled += 1
+            return False
+        bucket.take()
+        self.allowed += 1
+        return True
+
+    def stats(self):
+        return {
+            'tracked_users': len(self._users),
+            'allowed': self.allowed,
+            'throttled': self.throttled,
+            'duplicates': self.duplicates,
+        }